@@ -28,6 +28,7 @@ Parameters to tune:
 """
 
 import json
+import numpy as np
 import pandas as pd
 import networkx as nx
 
@@ -59,8 +60,10 @@ def main(verbose=True, show_demo=True):
         print("Detecting aisle structures...")
     locs = detect_aisles(locs, x_tolerance=3, y_tolerance=3, min_aisle_size=3)
     
-    num_v_aisles = len(set(locs['v_aisle']) - {-1})
-    num_h_aisles = len(set(locs['h_aisle']) - {-1})
+    v_aisles = locs['v_aisle'].to_numpy()
+    h_aisles = locs['h_aisle'].to_numpy()
+    num_v_aisles = len(np.unique(v_aisles[v_aisles >= 0]))
+    num_h_aisles = len(np.unique(h_aisles[h_aisles >= 0]))
     if verbose:
         print(f"Found {num_v_aisles} vertical aisles, {num_h_aisles} horizontal aisles")
     
@@ -7,9 +7,14 @@ This script demonstrates complete pick route optimization using:
 3. Realistic pathfinding that respects physical rack barriers
 """
 
+import io
 import json
+import sys
 import pandas as pd
 import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
 from warehouse_graph_enhanced import (
     detect_aisles_with_dimensions,
     build_enhanced_graph,
@@ -125,10 +130,14 @@ def run_tsp_with_enhanced_routing(warehouse_file, picks_file, start_location=Non
     print(f"Number of stops: {len(best_order)}")
     print()
     
+    # Index locations by ID once instead of masking the frame per stop
+    loc_index = locs.set_index('id')
+    
     print("Pick sequence:")
-    for i, loc in enumerate(best_order, 1):
-        loc_data = locs[locs['id'] == loc].iloc[0]
-        print(f"  {i:2d}. {loc:20s} (Zone {loc_data['zone']}, Type: {loc_data['type']})")
+    stops = loc_index.loc[best_order, ['zone', 'type']]
+    lines = [f"  {i:2d}. {loc:20s} (Zone {zone}, Type: {loc_type})"
+             for i, (loc, (zone, loc_type)) in enumerate(zip(best_order, stops.itertuples(index=False)), 1)]
+    sys.stdout.write("\n".join(lines) + "\n")
     
     print()
     
@@ -167,10 +176,8 @@ def run_tsp_with_enhanced_routing(warehouse_file, picks_file, start_location=Non
     print("ZONE DISTRIBUTION")
     print("-"*80)
     
-    zone_counts = {}
-    for loc in best_order[1:]:  # Skip start location
-        zone = locs[locs['id'] == loc].iloc[0]['zone']
-        zone_counts[zone] = zone_counts.get(zone, 0) + 1
+    zones = loc_index.loc[best_order[1:], 'zone'].to_numpy()  # Skip start location
+    zone_counts = Counter(zones.tolist())
     
     for zone, count in sorted(zone_counts.items()):
         print(f"  Zone {zone}: {count} picks")
@@ -192,6 +199,22 @@ def run_tsp_with_enhanced_routing(warehouse_file, picks_file, start_location=Non
     }
 
 
+def run_tsp_captured(warehouse_file, picks_file, start_location=None):
+    """
+    Run the TSP workflow with its report captured instead of printed.
+    
+    Lets independent runs execute in parallel worker processes without
+    interleaving their output.
+    
+    Returns:
+        tuple: (report_text, result_dict)
+    """
+    buffer = io.StringIO()
+    with redirect_stdout(buffer):
+        result = run_tsp_with_enhanced_routing(warehouse_file, picks_file, start_location)
+    return buffer.getvalue(), result
+
+
 def main():
     """Run TSP on both small and large warehouses"""
     
@@ -201,30 +224,37 @@ def main():
     print("╚" + "="*78 + "╝")
     print("\n")
     
+    # The two warehouses share no state, so solve them concurrently
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        fut_small = executor.submit(
+            run_tsp_captured,
+            warehouse_file="data/warehouse_locations.json",
+            picks_file="data/picks_small_test.txt",
+            start_location="Staging_1"
+        )
+        fut_large = executor.submit(
+            run_tsp_captured,
+            warehouse_file="data/warehouse_locations_large.json",
+            picks_file="data/picks_large_test.txt",
+            start_location="Staging_West"
+        )
+        report_small, result_small = fut_small.result()
+        report_large, result_large = fut_large.result()
+    
     results = []
     
     # Small warehouse
     print("\n" + "▀"*80)
     print("SMALL WAREHOUSE TEST")
     print("▀"*80 + "\n")
-    
-    result_small = run_tsp_with_enhanced_routing(
-        warehouse_file="data/warehouse_locations.json",
-        picks_file="data/picks_small_test.txt",
-        start_location="Staging_1"
-    )
+    sys.stdout.write(report_small)
     results.append(('Small', result_small))
     
     # Large warehouse
     print("\n" + "▀"*80)
     print("LARGE WAREHOUSE TEST")
     print("▀"*80 + "\n")
-    
-    result_large = run_tsp_with_enhanced_routing(
-        warehouse_file="data/warehouse_locations_large.json",
-        picks_file="data/picks_large_test.txt",
-        start_location="Staging_West"
-    )
+    sys.stdout.write(report_large)
     results.append(('Large', result_large))
     
     # Summary comparison
@@ -4,7 +4,6 @@ Warehouse Graph Visualization Module
 Handles visualization of warehouse graphs with different edge types and node colors.
 """
 
-import matplotlib.pyplot as plt
 import networkx as nx
 
 
@@ -18,6 +17,8 @@ def visualize_warehouse_graph(G, locs, title="Warehouse Graph Structure", figsiz
         title: Plot title
         figsize: Figure size tuple
     """
+    import matplotlib.pyplot as plt
+    
     pos = {n: (G.nodes[n]['x'], G.nodes[n]['y']) for n in G.nodes}
     
     # Color nodes by vertical aisle
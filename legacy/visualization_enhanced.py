@@ -3,15 +3,97 @@ Enhanced Visualization Module
 
 Provides visualization for warehouse graphs with rack detection and physical properties.
 Includes rack polygon rendering to show the physical extent of detected racks.
+
+matplotlib is imported inside the plotting functions so that importing this
+module (e.g. from the CLI with --visualize none) does not pay its start-up cost.
 """
 
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
-from matplotlib.patches import Rectangle, Polygon
 import networkx as nx
 import numpy as np
 
 
+def _group_by_rack(rack_id):
+    """
+    Sort-based grouping of rows by rack ID.
+    
+    Args:
+        rack_id: int64 array of rack IDs, one per bin
+    
+    Returns:
+        tuple: (racks, order, starts)
+            racks: unique rack IDs in order of first appearance
+            order: permutation that sorts rows by rack (stable)
+            starts: offset of each rack's segment within the sorted rows
+    """
+    uniq, first, inverse = np.unique(rack_id, return_index=True, return_inverse=True)
+    
+    # Relabel so racks keep the order in which they first appear
+    appearance = np.argsort(first, kind='stable')
+    rank = np.empty_like(appearance)
+    rank[appearance] = np.arange(len(appearance))
+    labels = rank[inverse.ravel()]
+    
+    order = np.argsort(labels, kind='stable')
+    starts = np.searchsorted(labels[order], np.arange(len(uniq)))
+    return uniq[appearance], order, starts
+
+
+def _rack_extents(rack_id, x, y, w, d):
+    """
+    Compute the bounding box of every rack in a single sort + segment pass.
+    
+    Args:
+        rack_id: int64 array of rack IDs
+        x, y: bin center coordinates
+        w, d: bin width and depth
+    
+    Returns:
+        tuple: (racks, min_x, max_x, min_y, max_y) as parallel arrays
+    """
+    racks, order, starts = _group_by_rack(rack_id)
+    x, y, w, d = x[order], y[order], w[order], d[order]
+    
+    half_w = np.maximum.reduceat(w, starts) / 2
+    half_d = np.maximum.reduceat(d, starts) / 2
+    min_x = np.minimum.reduceat(x, starts) - half_w
+    max_x = np.maximum.reduceat(x, starts) + half_w
+    min_y = np.minimum.reduceat(y, starts) - half_d
+    max_y = np.maximum.reduceat(y, starts) + half_d
+    
+    return racks, min_x, max_x, min_y, max_y
+
+
+def _rack_pairs(rack_id, x, y, side_code):
+    """
+    Find left/right rack pairs at similar y-coordinates.
+    
+    Args:
+        rack_id: int64 array of rack IDs
+        x, y: bin center coordinates
+        side_code: int8 array (1 = left, 2 = right)
+    
+    Returns:
+        tuple: (left_ids, right_ids) as parallel arrays
+    """
+    racks, order, starts = _group_by_rack(rack_id)
+    counts = np.diff(np.append(starts, len(order)))
+    
+    # A rack's side is taken from its first bin
+    side = side_code[order][starts]
+    mean_x = np.add.reduceat(x[order], starts) / counts
+    mean_y = np.add.reduceat(y[order], starts) / counts
+    
+    left = np.flatnonzero(side == 1)
+    right = np.flatnonzero(side == 2)
+    
+    # Pair every left rack with every right rack in the same aisle band
+    close = np.abs(mean_y[left, None] - mean_y[None, right]) < 30
+    ordered = mean_x[None, right] > mean_x[left, None]
+    li, ri = np.nonzero(close & ordered)
+    
+    return racks[left[li]], racks[right[ri]]
+
+
 def get_rack_polygons(locs):
     """
     Generate polygons for each detected rack based on the bins it contains.
@@ -30,26 +112,23 @@ def get_rack_polygons(locs):
     if len(bins_with_racks) == 0:
         return rack_polygons
     
-    # Group by rack_id
-    for rack_id in bins_with_racks['rack_id'].unique():
-        rack_bins = bins_with_racks[bins_with_racks['rack_id'] == rack_id]
-        
-        # Get the bounding box of all bins in this rack
-        min_x = rack_bins['x'].min() - rack_bins['width'].max() / 2
-        max_x = rack_bins['x'].max() + rack_bins['width'].max() / 2
-        min_y = rack_bins['y'].min() - rack_bins['depth'].max() / 2
-        max_y = rack_bins['y'].max() + rack_bins['depth'].max() / 2
-        
+    racks, min_x, max_x, min_y, max_y = _rack_extents(
+        bins_with_racks['rack_id'].to_numpy(dtype=np.int64),
+        bins_with_racks['x'].to_numpy(dtype=np.float64),
+        bins_with_racks['y'].to_numpy(dtype=np.float64),
+        bins_with_racks['width'].to_numpy(dtype=np.float64),
+        bins_with_racks['depth'].to_numpy(dtype=np.float64)
+    )
+    
+    for rack_id, x0, x1, y0, y1 in zip(racks, min_x, max_x, min_y, max_y):
         # Create polygon (rectangle) for the rack
-        polygon = [
-            (min_x, min_y),
-            (max_x, min_y),
-            (max_x, max_y),
-            (min_x, max_y),
-            (min_x, min_y)  # Close the polygon
+        rack_polygons[rack_id] = [
+            (x0, y0),
+            (x1, y0),
+            (x1, y1),
+            (x0, y1),
+            (x0, y0)  # Close the polygon
         ]
-        
-        rack_polygons[rack_id] = polygon
     
     return rack_polygons
 
@@ -61,41 +140,33 @@ def get_rack_pairs(locs):
     Returns:
         list: [(rack_id1, rack_id2, side1, side2)] for paired racks
     """
-    pairs = []
     bins_with_sides = locs[(locs['rack_side'] != 'none') & (locs['rack_id'] >= 0)]
     
     if len(bins_with_sides) == 0:
-        return pairs
-    
-    # Group by rack_id and get side
-    rack_info = {}
-    for rack_id in bins_with_sides['rack_id'].unique():
-        rack_bins = bins_with_sides[bins_with_sides['rack_id'] == rack_id]
-        side = rack_bins.iloc[0]['rack_side']
-        rack_info[rack_id] = side
-    
-    # Find pairs (left + right at similar y-coordinates)
-    left_racks = [rid for rid, side in rack_info.items() if side == 'left']
-    right_racks = [rid for rid, side in rack_info.items() if side == 'right']
-    
-    for left_id in left_racks:
-        left_bins = bins_with_sides[bins_with_sides['rack_id'] == left_id]
-        left_y = left_bins['y'].mean()
-        left_x = left_bins['x'].mean()
-        
-        for right_id in right_racks:
-            right_bins = bins_with_sides[bins_with_sides['rack_id'] == right_id]
-            right_y = right_bins['y'].mean()
-            right_x = right_bins['x'].mean()
-            
-            # Check if they're at similar y-coordinates (same aisle)
-            if abs(left_y - right_y) < 30 and right_x > left_x:
-                pairs.append((left_id, right_id, 'left', 'right'))
-    
-    return pairs
+        return []
+    
+    side = bins_with_sides['rack_side'].to_numpy()
+    side_code = np.where(side == 'left', 1, np.where(side == 'right', 2, 0)).astype(np.int8)
+    
+    left_ids, right_ids = _rack_pairs(
+        bins_with_sides['rack_id'].to_numpy(dtype=np.int64),
+        bins_with_sides['x'].to_numpy(dtype=np.float64),
+        bins_with_sides['y'].to_numpy(dtype=np.float64),
+        side_code
+    )
+    
+    return [(left_id, right_id, 'left', 'right') for left_id, right_id in zip(left_ids, right_ids)]
+
 
+def _select_backend(output_file, display):
+    """Switch to the non-interactive Agg backend when only writing a PNG."""
+    if output_file and output_file.endswith('.png') and not display:
+        import matplotlib
+        matplotlib.use('Agg', force=True)
 
-def visualize_graph_with_racks(locs, G, output_file=None, title="Warehouse Graph with Racks", display=True):
+
+def visualize_graph_with_racks(locs, G, output_file=None, title="Warehouse Graph with Racks", display=True,
+                               dpi=150):
     """
     Visualize the warehouse graph with rack polygons overlaid.
     
@@ -105,7 +176,15 @@ def visualize_graph_with_racks(locs, G, output_file=None, title="Warehouse Graph
         output_file: Optional path to save the figure
         title: Plot title
         display: Whether to display the plot window
+        dpi: Resolution of the saved figure (use ~100 for quick previews)
     """
+    _select_backend(output_file, display)
+    
+    import matplotlib.pyplot as plt
+    import matplotlib.patches as mpatches
+    from matplotlib.collections import LineCollection
+    from matplotlib.patches import Rectangle
+    
     fig, ax = plt.subplots(figsize=(16, 12))
     
     # Get rack polygons
@@ -138,11 +217,10 @@ def visualize_graph_with_racks(locs, G, output_file=None, title="Warehouse Graph
     # Draw edges
     pos = {row['id']: (row['x'], row['y']) for _, row in locs.iterrows() if row['id'] in G.nodes()}
     
-    for u, v in G.edges():
-        if u in pos and v in pos:
-            x = [pos[u][0], pos[v][0]]
-            y = [pos[u][1], pos[v][1]]
-            ax.plot(x, y, 'b-', alpha=0.3, linewidth=0.8, zorder=1)
+    # One rasterized collection instead of a vector artist per edge
+    segments = [(pos[u], pos[v]) for u, v in G.edges() if u in pos and v in pos]
+    ax.add_collection(LineCollection(segments, colors='b', alpha=0.3, linewidths=0.8,
+                                     zorder=1, rasterized=True))
     
     # Draw nodes by type
     node_types = {
@@ -198,7 +276,7 @@ def visualize_graph_with_racks(locs, G, output_file=None, title="Warehouse Graph
     plt.tight_layout()
     
     if output_file:
-        plt.savefig(output_file, dpi=150, bbox_inches='tight')
+        plt.savefig(output_file, dpi=dpi, bbox_inches='tight')
         print(f"Saved visualization to: {output_file}")
     
     if display:
@@ -208,7 +286,7 @@ def visualize_graph_with_racks(locs, G, output_file=None, title="Warehouse Graph
 
 
 def visualize_route_with_racks(locs, G, route, pick_order, start, end, total_distance, 
-                                output_file=None, display=True):
+                                output_file=None, display=True, dpi=150):
     """
     Visualize the optimized route with rack polygons overlaid.
     
@@ -222,7 +300,12 @@ def visualize_route_with_racks(locs, G, route, pick_order, start, end, total_dis
         total_distance: Total route distance
         output_file: Optional path to save the figure
         display: Whether to display the plot window
+        dpi: Resolution of the saved figure (use ~100 for quick previews)
     """
+    _select_backend(output_file, display)
+    
+    import matplotlib.pyplot as plt
+    
     fig, ax = plt.subplots(figsize=(16, 12))
     
     # Get rack polygons
@@ -252,8 +335,11 @@ def visualize_route_with_racks(locs, G, route, pick_order, start, end, total_dis
         
         ax.fill(poly_x, poly_y, color=color, alpha=alpha, edgecolor='gray', linewidth=1.0)
     
-    # Get positions
-    pos = {row['id']: (row['x'], row['y']) for _, row in locs.iterrows()}
+    # Get positions as one coordinate array plus an ID -> row lookup
+    ids = locs['id'].to_numpy()
+    xy = locs[['x', 'y']].to_numpy(dtype=np.float64)
+    id_to_idx = dict(zip(ids, range(len(ids))))
+    pos = dict(zip(ids, map(tuple, xy)))
     
     # Draw route path
     route_coords = [pos[node] for node in route if node in pos]
@@ -270,25 +356,21 @@ def visualize_route_with_racks(locs, G, route, pick_order, start, end, total_dis
                     head_width=3, head_length=2, fc='red', ec='red', alpha=0.6, zorder=5)
     
     # Draw all nodes (lighter)
-    all_nodes = [row['id'] for _, row in locs.iterrows() if row['id'] in G.nodes()]
-    all_pos = [pos[n] for n in all_nodes if n in pos]
-    if len(all_pos) > 0:
-        x = [p[0] for p in all_pos]
-        y = [p[1] for p in all_pos]
-        ax.scatter(x, y, c='lightgray', s=30, alpha=0.5, zorder=2)
+    in_graph = np.isin(ids, list(G.nodes()))
+    if in_graph.any():
+        ax.scatter(xy[in_graph, 0], xy[in_graph, 1], c='lightgray', s=30, alpha=0.5,
+                  zorder=2, rasterized=True)
     
     # Highlight pick locations
-    pick_locs = [node for node in pick_order if node in pos]
-    if len(pick_locs) > 0:
-        pick_pos = [pos[node] for node in pick_locs]
-        x = [p[0] for p in pick_pos]
-        y = [p[1] for p in pick_pos]
-        ax.scatter(x, y, c='green', s=150, marker='*', label='Pick Locations', 
+    pick_idx = np.fromiter((id_to_idx[n] for n in pick_order if n in id_to_idx), dtype=np.int64)
+    if len(pick_idx) > 0:
+        pick_xy = xy[pick_idx]
+        ax.scatter(pick_xy[:, 0], pick_xy[:, 1], c='green', s=150, marker='*', label='Pick Locations', 
                   zorder=6, edgecolors='darkgreen', linewidth=2)
         
         # Label pick sequence
-        for i, node in enumerate(pick_locs, 1):
-            ax.annotate(str(i), pos[node], fontsize=8, ha='center', va='center',
+        for i, (px, py) in enumerate(pick_xy, 1):
+            ax.annotate(str(i), (px, py), fontsize=8, ha='center', va='center',
                        color='white', weight='bold', zorder=7)
     
     # Highlight start/end
@@ -310,7 +392,7 @@ def visualize_route_with_racks(locs, G, route, pick_order, start, end, total_dis
     plt.tight_layout()
     
     if output_file:
-        plt.savefig(output_file, dpi=150, bbox_inches='tight')
+        plt.savefig(output_file, dpi=dpi, bbox_inches='tight')
         print(f"Saved route visualization to: {output_file}")
     
     if display:
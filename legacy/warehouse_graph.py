@@ -6,9 +6,19 @@ including aisle detection and connection rules.
 """
 
 import math
+from concurrent.futures import ThreadPoolExecutor
 import networkx as nx
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import cKDTree
 from sklearn.cluster import DBSCAN
-from collections import defaultdict
+from sklearn.neighbors import BallTree
+
+
+# Category order for the aisle_side column ('none', 'left', 'right')
+AISLE_SIDES = ['none', 'left', 'right']
 
 
 def calculate_distance(p1, p2):
@@ -16,6 +26,81 @@ def calculate_distance(p1, p2):
     return math.sqrt((p1[0] - p2[0])**2 + (p1[1] - p2[1])**2)
 
 
+def _sequential_aisle_pairs(aisle, key, x, y, max_dist):
+    """
+    Pair each aisle node with the next node along the aisle, vectorized.
+    
+    Nodes are ordered by aisle label and then by ``key`` (y for vertical
+    aisles, x for horizontal ones) in a single stable lexsort, so the
+    consecutive pairs match sorting each aisle separately.
+    
+    Args:
+        aisle: Aisle label per node (-1 = not in an aisle)
+        key: Coordinate to order nodes along their aisle
+        x, y: Node coordinates
+        max_dist: Maximum distance between sequential nodes
+    
+    Returns:
+        tuple: (idx1, idx2, dist) arrays of positional indices and distances
+    """
+    members = np.flatnonzero(aisle >= 0)
+    order = members[np.lexsort((key[members], aisle[members]))]
+    
+    dx = np.diff(x[order])
+    dy = np.diff(y[order])
+    d2 = dx * dx + dy * dy
+    keep = (np.diff(aisle[order]) == 0) & (d2 <= max_dist * max_dist)
+    
+    return order[:-1][keep], order[1:][keep], np.sqrt(d2[keep])
+
+
+def _cross_aisle_pairs(nodes, x, y, va, ha, pair_arr, side_arr, max_dist,
+                       prevent_cross_aisle_shortcuts):
+    """
+    Find cross-aisle connections among a subset of nodes.
+    
+    Candidate pairs within ``max_dist`` come from a KD-tree, so only nearby
+    pairs are ever materialised. Same-aisle and opposite-shelf pairs are
+    dropped from the two index columns before any distance is computed.
+    
+    Args:
+        nodes: Positional indices of the candidate nodes (ascending)
+        x, y: Node coordinates
+        va, ha: Vertical / horizontal aisle labels per node
+        pair_arr, side_arr: Aisle pair id and shelf side per node
+        max_dist: Maximum distance for cross-aisle connections
+        prevent_cross_aisle_shortcuts: Skip pairs on opposite sides of an aisle pair
+    
+    Returns:
+        tuple: (idx1, idx2, dist) arrays with idx1 < idx2, in row-major order
+    """
+    nodes = np.asarray(nodes, dtype=np.intp)
+    pts = np.column_stack((x[nodes], y[nodes]))
+    pairs = cKDTree(pts).query_pairs(r=max_dist, output_type='ndarray')
+    pairs = np.sort(pairs, axis=1)
+    pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+    i = nodes[pairs[:, 0]]
+    j = nodes[pairs[:, 1]]
+    
+    # Skip pairs already connected by the same vertical or horizontal aisle
+    keep = ~((va[i] == va[j]) & (va[i] >= 0))
+    keep &= ~((ha[i] == ha[j]) & (ha[i] >= 0))
+    
+    # Don't connect opposite sides of the same aisle pair
+    if prevent_cross_aisle_shortcuts:
+        keep &= ~((pair_arr[i] == pair_arr[j]) & (pair_arr[i] >= 0) & (side_arr[i] != side_arr[j]))
+    i = i[keep]
+    j = j[keep]
+    
+    # Exact distance check only for the pairs that survive the aisle rules
+    dx = x[i] - x[j]
+    dy = y[i] - y[j]
+    d2 = dx * dx + dy * dy
+    keep = d2 <= max_dist * max_dist
+    
+    return i[keep], j[keep], np.sqrt(d2[keep])
+
+
 def detect_aisles(locs, x_tolerance=3, y_tolerance=3, min_aisle_size=3):
     """
     Detect vertical and horizontal aisles by clustering locations
@@ -34,59 +119,61 @@ def detect_aisles(locs, x_tolerance=3, y_tolerance=3, min_aisle_size=3):
     Returns:
         DataFrame with added columns: v_aisle, h_aisle, aisle_pair, aisle_side
     """
-    coords = locs[['x', 'y']].values
-    
-    # Detect vertical aisles (similar x-coordinates)
-    x_coords = locs['x'].values.reshape(-1, 1)
-    vertical_clusters = DBSCAN(eps=x_tolerance, min_samples=min_aisle_size).fit(x_coords)
-    
-    # Detect horizontal aisles (similar y-coordinates)
-    y_coords = locs['y'].values.reshape(-1, 1)
-    horizontal_clusters = DBSCAN(eps=y_tolerance, min_samples=min_aisle_size).fit(y_coords)
+    # The two fits are independent and sklearn releases the GIL in its
+    # neighbour search, so run them side by side
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        # Detect vertical aisles (similar x-coordinates)
+        x_coords = locs['x'].values.reshape(-1, 1)
+        vertical_future = pool.submit(DBSCAN(eps=x_tolerance, min_samples=min_aisle_size).fit, x_coords)
+        
+        # Detect horizontal aisles (similar y-coordinates)
+        y_coords = locs['y'].values.reshape(-1, 1)
+        horizontal_future = pool.submit(DBSCAN(eps=y_tolerance, min_samples=min_aisle_size).fit, y_coords)
+        
+        vertical_clusters = vertical_future.result()
+        horizontal_clusters = horizontal_future.result()
     
-    locs['v_aisle'] = vertical_clusters.labels_
-    locs['h_aisle'] = horizontal_clusters.labels_
+    locs['v_aisle'] = vertical_clusters.labels_.astype(np.int32)
+    locs['h_aisle'] = horizontal_clusters.labels_.astype(np.int32)
     
     # Detect aisle sides for paired vertical aisles
     # If two vertical aisles are close together (< 2*x_tolerance), they form opposite sides
-    locs['aisle_pair'] = -1  # -1 means not part of a pair
-    locs['aisle_side'] = 'none'  # 'left', 'right', or 'none'
+    va = locs['v_aisle'].to_numpy()
+    pair_out = np.full(len(locs), -1, dtype=np.int32)  # -1 means not part of a pair
+    side_out = np.zeros(len(locs), dtype=np.int8)  # codes into AISLE_SIDES
     
-    v_aisle_centers = {}
-    for aisle_id in set(locs['v_aisle']) - {-1}:
-        aisle_nodes = locs[locs['v_aisle'] == aisle_id]
-        center_x = aisle_nodes['x'].mean()
-        v_aisle_centers[aisle_id] = center_x
+    v_aisle_centers = locs.loc[locs['v_aisle'] >= 0].groupby('v_aisle')['x'].mean().to_dict()
     
     # Find pairs of vertical aisles that are close together
-    paired_aisles = set()
+    aisle_ids = np.array(sorted(v_aisle_centers.keys()), dtype=np.int64)
+    centers = np.array([v_aisle_centers[a] for a in aisle_ids], dtype=np.float64)
+    paired = np.zeros(len(aisle_ids), dtype=bool)
     pair_id = 0
-    aisle_ids = sorted(v_aisle_centers.keys())
     
-    for i, aisle1 in enumerate(aisle_ids):
-        if aisle1 in paired_aisles:
+    for i in range(len(aisle_ids)):
+        if paired[i]:
             continue
-        for aisle2 in aisle_ids[i+1:]:
-            if aisle2 in paired_aisles:
-                continue
-            
-            distance = abs(v_aisle_centers[aisle1] - v_aisle_centers[aisle2])
-            # If aisles are close (within reasonable distance), consider them opposite sides
-            # Typical aisle width is 10-15 units based on your data
-            if distance <= 15:  # Adjust based on typical aisle spacing
-                # Mark both aisles as paired
-                left_aisle = aisle1 if v_aisle_centers[aisle1] < v_aisle_centers[aisle2] else aisle2
-                right_aisle = aisle2 if left_aisle == aisle1 else aisle1
-                
-                locs.loc[locs['v_aisle'] == left_aisle, 'aisle_pair'] = pair_id
-                locs.loc[locs['v_aisle'] == left_aisle, 'aisle_side'] = 'left'
-                locs.loc[locs['v_aisle'] == right_aisle, 'aisle_pair'] = pair_id
-                locs.loc[locs['v_aisle'] == right_aisle, 'aisle_side'] = 'right'
-                
-                paired_aisles.add(aisle1)
-                paired_aisles.add(aisle2)
-                pair_id += 1
-                break
+        
+        # If aisles are close (within reasonable distance), consider them opposite sides
+        # Typical aisle width is 10-15 units based on your data
+        close = ~paired[i+1:] & (np.abs(centers[i+1:] - centers[i]) <= 15)  # Adjust based on typical aisle spacing
+        if not close.any():
+            continue
+        j = i + 1 + int(np.argmax(close))
+        
+        # Mark both aisles as paired
+        left, right = (i, j) if centers[i] < centers[j] else (j, i)
+        left_mask = va == aisle_ids[left]
+        right_mask = va == aisle_ids[right]
+        pair_out[left_mask | right_mask] = pair_id
+        side_out[left_mask] = 1
+        side_out[right_mask] = 2
+        
+        paired[i] = paired[j] = True
+        pair_id += 1
+    
+    locs['aisle_pair'] = pair_out
+    locs['aisle_side'] = pd.Categorical.from_codes(side_out, AISLE_SIDES)
     
     return locs
 
@@ -102,7 +189,9 @@ def build_aisle_graph(locs, max_intra_aisle_dist=20, max_cross_aisle_dist=15, en
     5. Preventing direct connections across opposite shelf faces
     
     Args:
-        locs: DataFrame with location data (must have aisle detection columns)
+        locs: DataFrame with location data (must have aisle detection columns).
+              Rows are addressed by position, so any index works; the
+              caller's DataFrame is not modified.
         max_intra_aisle_dist: Maximum distance between sequential aisle nodes
         max_cross_aisle_dist: Maximum distance for cross-aisle connections
         ensure_connectivity: Ensure all components are connected
@@ -115,188 +204,124 @@ def build_aisle_graph(locs, max_intra_aisle_dist=20, max_cross_aisle_dist=15, en
     Returns:
         List of edges as (node1_id, node2_id, distance) tuples
     """
-    edges = []
-    coords = locs[['x', 'y']].values
-    ids = locs['id'].tolist()
-    
-    # Group nodes by vertical aisles
-    v_aisles = defaultdict(list)
-    for idx, row in locs.iterrows():
-        if row['v_aisle'] >= 0:  # -1 means not in a cluster
-            v_aisles[row['v_aisle']].append(idx)
-    
-    # Group nodes by horizontal aisles
-    h_aisles = defaultdict(list)
-    for idx, row in locs.iterrows():
-        if row['h_aisle'] >= 0:
-            h_aisles[row['h_aisle']].append(idx)
+    locs = locs.reset_index(drop=True)
+    
+    # Column arrays for vectorized aisle work
+    x = locs['x'].to_numpy(dtype=np.float64)
+    y = locs['y'].to_numpy(dtype=np.float64)
+    coords = np.column_stack((x, y))
+    va = locs['v_aisle'].to_numpy()
+    ha = locs['h_aisle'].to_numpy()
+    ids_arr = locs['id'].to_numpy()
+    pair_arr = locs['aisle_pair'].to_numpy()
+    # Side codes only need to compare equal/unequal, so category codes will do
+    side_arr = locs['aisle_side'].astype('category').cat.codes.to_numpy()
+    
+    # Edges are collected as parallel (src, dst, dist) arrays of positional
+    # indices, one chunk per stage, and turned into id tuples once at the end
+    edge_src, edge_dst, edge_dist = [], [], []
+    
+    def add_edges(src, dst, dists):
+        edge_src.append(np.asarray(src, dtype=np.intp))
+        edge_dst.append(np.asarray(dst, dtype=np.intp))
+        edge_dist.append(np.asarray(dists, dtype=np.float64))
     
     # Identify intersection nodes (nodes that are part of both vertical and horizontal aisles)
-    intersection_nodes = set()
-    for idx, row in locs.iterrows():
-        if row['v_aisle'] >= 0 and row['h_aisle'] >= 0:
-            intersection_nodes.add(idx)
+    intersection_nodes = np.flatnonzero((va >= 0) & (ha >= 0))
     
     # Identify aisle pairs (for logging only)
-    aisle_pairs = locs[locs['aisle_pair'] >= 0]
-    num_pairs = len(aisle_pairs['aisle_pair'].unique()) if len(aisle_pairs) > 0 else 0
+    num_pairs = len(np.unique(pair_arr[pair_arr >= 0]))
     if num_pairs > 0 and verbose:
         print(f"Detected {num_pairs} aisle pair(s) with opposite shelves")
     
     # Connect nodes within same vertical aisle (sort by y-coordinate)
-    for aisle_id, node_indices in v_aisles.items():
-        if len(node_indices) < 2:
-            continue
-        # Sort by y-coordinate
-        sorted_nodes = sorted(node_indices, key=lambda i: locs.loc[i, 'y'])
-        for i in range(len(sorted_nodes) - 1):
-            idx1, idx2 = sorted_nodes[i], sorted_nodes[i + 1]
-            dist = calculate_distance(coords[idx1], coords[idx2])
-            if dist <= max_intra_aisle_dist:
-                edges.append((ids[idx1], ids[idx2], dist))
+    add_edges(*_sequential_aisle_pairs(va, y, x, y, max_intra_aisle_dist))
     
     # Connect nodes within same horizontal aisle (sort by x-coordinate)
-    for aisle_id, node_indices in h_aisles.items():
-        if len(node_indices) < 2:
-            continue
-        # Sort by x-coordinate
-        sorted_nodes = sorted(node_indices, key=lambda i: locs.loc[i, 'x'])
-        for i in range(len(sorted_nodes) - 1):
-            idx1, idx2 = sorted_nodes[i], sorted_nodes[i + 1]
-            dist = calculate_distance(coords[idx1], coords[idx2])
-            if dist <= max_intra_aisle_dist:
-                # Check if this would create a shortcut across opposite shelf faces
-                if prevent_cross_aisle_shortcuts:
-                    pair1 = locs.loc[idx1, 'aisle_pair']
-                    pair2 = locs.loc[idx2, 'aisle_pair']
-                    side1 = locs.loc[idx1, 'aisle_side']
-                    side2 = locs.loc[idx2, 'aisle_side']
-                    
-                    # Allow connections if they're at the ends of the aisle (y-coordinate extremes)
-                    # This allows going around the aisle
-                    is_at_aisle_end = False
-                    if pair1 >= 0 and pair1 == pair2 and side1 != side2:
-                        # Check if both nodes are at extreme y positions for their aisle pair
-                        pair_nodes = locs[locs['aisle_pair'] == pair1]
-                        y_min = pair_nodes['y'].min()
-                        y_max = pair_nodes['y'].max()
-                        y1 = locs.loc[idx1, 'y']
-                        y2 = locs.loc[idx2, 'y']
-                        
-                        # Allow if both are near the min or max end
-                        tolerance = 5  # y-coordinate tolerance for "end of aisle"
-                        if (abs(y1 - y_min) <= tolerance and abs(y2 - y_min) <= tolerance) or \
-                           (abs(y1 - y_max) <= tolerance and abs(y2 - y_max) <= tolerance):
-                            is_at_aisle_end = True
-                    
-                    # Only add if they're NOT on opposite sides OR if they're at aisle ends
-                    if not (pair1 >= 0 and pair1 == pair2 and side1 != side2) or is_at_aisle_end:
-                        edges.append((ids[idx1], ids[idx2], dist))
-                else:
-                    edges.append((ids[idx1], ids[idx2], dist))
+    src, dst, dists = _sequential_aisle_pairs(ha, x, x, y, max_intra_aisle_dist)
+    if not prevent_cross_aisle_shortcuts:
+        add_edges(src, dst, dists)
+    else:
+        # y extent of every aisle pair, for the aisle-end check below
+        pair_y_range = locs[locs['aisle_pair'] >= 0].groupby('aisle_pair')['y'].agg(['min', 'max']).to_dict('index')
+        # Pull each pair's fields out as native Python values in one go
+        pair_fields = zip(pair_arr[src].tolist(), pair_arr[dst].tolist(),
+                          side_arr[src].tolist(), side_arr[dst].tolist(),
+                          y[src].tolist(), y[dst].tolist())
+        allowed = []
+        for pair1, pair2, side1, side2, y1, y2 in pair_fields:
+            # Check if this would create a shortcut across opposite shelf faces
+            # Allow connections if they're at the ends of the aisle (y-coordinate extremes)
+            # This allows going around the aisle
+            is_at_aisle_end = False
+            if pair1 >= 0 and pair1 == pair2 and side1 != side2:
+                # Check if both nodes are at extreme y positions for their aisle pair
+                y_min = pair_y_range[pair1]['min']
+                y_max = pair_y_range[pair1]['max']
+                
+                # Allow if both are near the min or max end
+                tolerance = 5  # y-coordinate tolerance for "end of aisle"
+                if (abs(y1 - y_min) <= tolerance and abs(y2 - y_min) <= tolerance) or \
+                   (abs(y1 - y_max) <= tolerance and abs(y2 - y_max) <= tolerance):
+                    is_at_aisle_end = True
+            
+            # Only add if they're NOT on opposite sides OR if they're at aisle ends
+            allowed.append(not (pair1 >= 0 and pair1 == pair2 and side1 != side2) or is_at_aisle_end)
+        allowed = np.array(allowed, dtype=bool)
+        add_edges(src[allowed], dst[allowed], dists[allowed])
     
     # Find cross-aisle connections
     if only_connect_intersections:
         # Only connect at true intersection points (nodes in both vertical and horizontal aisles)
         # This prevents mid-aisle connections
-        for i in intersection_nodes:
-            for j in intersection_nodes:
-                if i >= j:
-                    continue
-                # Skip if already in same aisle
-                if (locs.loc[i, 'v_aisle'] == locs.loc[j, 'v_aisle'] and locs.loc[i, 'v_aisle'] >= 0):
-                    continue
-                if (locs.loc[i, 'h_aisle'] == locs.loc[j, 'h_aisle'] and locs.loc[i, 'h_aisle'] >= 0):
-                    continue
-                
-                # Check if this would create a shortcut across opposite shelf faces
-                if prevent_cross_aisle_shortcuts:
-                    pair1 = locs.loc[i, 'aisle_pair']
-                    pair2 = locs.loc[j, 'aisle_pair']
-                    side1 = locs.loc[i, 'aisle_side']
-                    side2 = locs.loc[j, 'aisle_side']
-                    
-                    # Don't connect opposite sides of the same aisle pair
-                    if pair1 >= 0 and pair1 == pair2 and side1 != side2:
-                        continue
-                
-                dist = calculate_distance(coords[i], coords[j])
-                if dist <= max_cross_aisle_dist:
-                    edges.append((ids[i], ids[j], dist))
+        candidates = intersection_nodes
     else:
         # Original behavior: connect any close nodes across aisles
-        for i in range(len(locs)):
-            for j in range(i + 1, len(locs)):
-                # Skip if already in same aisle
-                if (locs.loc[i, 'v_aisle'] == locs.loc[j, 'v_aisle'] and locs.loc[i, 'v_aisle'] >= 0):
-                    continue
-                if (locs.loc[i, 'h_aisle'] == locs.loc[j, 'h_aisle'] and locs.loc[i, 'h_aisle'] >= 0):
-                    continue
-                
-                # Check if this would create a shortcut across opposite shelf faces
-                if prevent_cross_aisle_shortcuts:
-                    pair1 = locs.loc[i, 'aisle_pair']
-                    pair2 = locs.loc[j, 'aisle_pair']
-                    side1 = locs.loc[i, 'aisle_side']
-                    side2 = locs.loc[j, 'aisle_side']
-                    
-                    # Don't connect opposite sides of the same aisle pair
-                    if pair1 >= 0 and pair1 == pair2 and side1 != side2:
-                        continue
-                
-                dist = calculate_distance(coords[i], coords[j])
-                if dist <= max_cross_aisle_dist:
-                    edges.append((ids[i], ids[j], dist))
+        candidates = np.arange(len(locs))
+    add_edges(*_cross_aisle_pairs(candidates, x, y, va, ha, pair_arr, side_arr,
+                                  max_cross_aisle_dist, prevent_cross_aisle_shortcuts))
     
     # Connect isolated nodes (not in any aisle) to nearest neighbors (connect to multiple for redundancy)
-    isolated = locs[(locs['v_aisle'] == -1) & (locs['h_aisle'] == -1)].index
-    for iso_idx in isolated:
-        # Find 2 nearest neighbors for better connectivity
-        distances = []
-        for idx in locs.index:
-            if idx == iso_idx:
-                continue
-            dist = calculate_distance(coords[iso_idx], coords[idx])
-            distances.append((idx, dist))
-        
-        # Sort by distance and connect to 2 nearest
-        distances.sort(key=lambda x: x[1])
-        for idx, dist in distances[:2]:
-            edges.append((ids[iso_idx], ids[idx], dist))
+    isolated = np.flatnonzero((va == -1) & (ha == -1))
+    if len(isolated) > 0:
+        # Ask for 3 neighbours: the nearest one is normally the node itself
+        k = min(3, len(locs))
+        nbr_dists, nbrs = BallTree(coords).query(coords[isolated], k=k)
+        # Keep the 2 nearest neighbours other than the node itself
+        not_self = nbrs != isolated[:, None]
+        keep = not_self & (np.cumsum(not_self, axis=1) <= 2)
+        add_edges(np.broadcast_to(isolated[:, None], nbrs.shape)[keep], nbrs[keep], nbr_dists[keep])
+    
+    src = np.concatenate(edge_src)
+    dst = np.concatenate(edge_dst)
+    dists = np.concatenate(edge_dist)
     
     # Ensure connectivity by checking and connecting components
     if ensure_connectivity:
-        # Build temporary graph to check connectivity
-        temp_G = nx.Graph()
-        for _, row in locs.iterrows():
-            temp_G.add_node(row['id'])
-        for a, b, d in edges:
-            temp_G.add_edge(a, b)
+        # Label connected components on a sparse adjacency matrix of positional indices
+        n = len(locs)
+        adjacency = csr_matrix((np.ones(len(src)), (src, dst)), shape=(n, n))
+        n_components, labels = connected_components(adjacency, directed=False)
         
         # Connect disconnected components
-        components = list(nx.connected_components(temp_G))
-        if len(components) > 1:
+        if n_components > 1:
             # Connect each component to its nearest neighbor in another component
-            for i in range(len(components) - 1):
-                comp1 = components[i]
-                comp2 = components[i + 1]
-                
-                min_dist = float('inf')
-                best_pair = None
+            bridges = []
+            for i in range(n_components - 1):
+                comp1_idx = np.flatnonzero(labels == i)
+                comp2_idx = np.flatnonzero(labels == i + 1)
                 
-                for node1 in comp1:
-                    idx1 = locs[locs['id'] == node1].index[0]
-                    for node2 in comp2:
-                        idx2 = locs[locs['id'] == node2].index[0]
-                        dist = calculate_distance(coords[idx1], coords[idx2])
-                        if dist < min_dist:
-                            min_dist = dist
-                            best_pair = (node1, node2, dist)
-                
-                if best_pair:
-                    edges.append(best_pair)
+                # Nearest comp2 node for every comp1 node, then the closest of those
+                comp_dists, nearest = BallTree(coords[comp2_idx]).query(coords[comp1_idx], k=1)
+                best = int(np.argmin(comp_dists[:, 0]))
+                bridges.append((comp1_idx[best], comp2_idx[nearest[best, 0]], comp_dists[best, 0]))
+            
+            bridge_src, bridge_dst, bridge_dist = zip(*bridges)
+            src = np.concatenate((src, bridge_src))
+            dst = np.concatenate((dst, bridge_dst))
+            dists = np.concatenate((dists, bridge_dist))
     
-    return edges
+    return list(zip(ids_arr[src].tolist(), ids_arr[dst].tolist(), dists.tolist()))
 
 
 def create_graph_from_edges(locs, edges):
@@ -313,13 +338,22 @@ def create_graph_from_edges(locs, edges):
     G = nx.Graph()
     
     # Add nodes with attributes
-    for _, row in locs.iterrows():
-        G.add_node(row.id, x=row.x, y=row.y, v_aisle=row.v_aisle, h_aisle=row.h_aisle,
-                   aisle_pair=row.aisle_pair, aisle_side=row.aisle_side)
-    
-    # Add edges
-    for a, b, d in edges:
-        if not G.has_edge(a, b):  # Avoid duplicate edges
-            G.add_edge(a, b, weight=d)
+    cols = ['id', 'x', 'y', 'v_aisle', 'h_aisle', 'aisle_pair', 'aisle_side']
+    G.add_nodes_from(
+        (node_id, {'x': x, 'y': y, 'v_aisle': v_aisle, 'h_aisle': h_aisle,
+                   'aisle_pair': aisle_pair, 'aisle_side': aisle_side})
+        for node_id, x, y, v_aisle, h_aisle, aisle_pair, aisle_side
+        in locs[cols].itertuples(index=False, name=None)
+    )
+    
+    # Add edges, keeping the first occurrence of each undirected pair
+    edge_df = pd.DataFrame(edges, columns=['a', 'b', 'weight'])
+    a = edge_df['a'].to_numpy(dtype=object)
+    b = edge_df['b'].to_numpy(dtype=object)
+    swap = b < a
+    edge_df['lo'] = np.where(swap, b, a)
+    edge_df['hi'] = np.where(swap, a, b)
+    edge_df = edge_df.drop_duplicates(subset=['lo', 'hi'])
+    G.add_weighted_edges_from(zip(edge_df['a'], edge_df['b'], edge_df['weight']))
     
     return G
@@ -9,15 +9,102 @@ Leverages physical properties (width, depth, traversable) to build more accurate
 """
 
 import math
+from concurrent.futures import ThreadPoolExecutor
 import networkx as nx
-from sklearn.cluster import DBSCAN
-from collections import defaultdict
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import cKDTree
 import numpy as np
 
 
 def calculate_distance(p1, p2):
     """Calculate Euclidean distance between two points"""
-    return math.sqrt((p1[0] - p2[0])**2 + (p1[1] - p2[1])**2)
+    return math.hypot(p1[0] - p2[0], p1[1] - p2[1])
+
+
+def cluster_1d(values, eps, min_samples):
+    """
+    DBSCAN for one-dimensional data, using a sort instead of a neighbour index.
+    
+    On a line, each point's eps-neighbourhood is a contiguous window of the
+    sorted values, and core points chain into one cluster exactly when
+    consecutive core points are within eps. Labels match
+    DBSCAN(eps, min_samples).fit(values.reshape(-1, 1)): clusters are
+    numbered in order of their first core point in the input, and a border
+    point joins the lowest-numbered cluster that reaches it. Distances are
+    exact |a - b|, without the rounding of sklearn's expanded form.
+    
+    Args:
+        values: 1-D array of coordinates
+        eps: Maximum distance between two neighbouring points
+        min_samples: Neighbourhood size (including the point) for a core point
+    
+    Returns:
+        Array of cluster labels, -1 for noise
+    """
+    values = np.asarray(values, dtype=np.float64).ravel()
+    n = len(values)
+    labels = np.full(n, -1, dtype=np.int64)
+    if n == 0:
+        return labels
+    
+    order = np.argsort(values, kind='stable')
+    xs = values[order]
+    pos = np.arange(n)
+    
+    def within(i, j):
+        return np.abs(xs[j] - xs[i]) <= eps
+    
+    # [lo, hi) window of eps-neighbours in sorted order; searchsorted gives a
+    # close guess which is then nudged to the exact distance test
+    hi = np.clip(np.searchsorted(xs, xs + eps, side='right'), pos + 1, n)
+    while True:
+        shrink = (hi - 1 > pos) & ~within(pos, np.maximum(hi - 1, 0))
+        grow = (hi < n) & within(pos, np.minimum(hi, n - 1))
+        if not (shrink.any() or grow.any()):
+            break
+        hi = hi - shrink + grow
+    lo = np.clip(np.searchsorted(xs, xs - eps, side='left'), 0, pos)
+    while True:
+        shrink = (lo < pos) & ~within(np.minimum(lo, n - 1), pos)
+        grow = (lo > 0) & within(np.maximum(lo - 1, 0), pos)
+        if not (shrink.any() or grow.any()):
+            break
+        lo = lo + shrink - grow
+    
+    core_pos = np.flatnonzero((hi - lo) >= min_samples)
+    if len(core_pos) == 0:
+        return labels
+    
+    # Split the sorted core points wherever the gap exceeds eps, then number
+    # the groups by their smallest original index
+    group = np.concatenate(([0], np.cumsum(~within(core_pos[:-1], core_pos[1:]))))
+    n_groups = group[-1] + 1
+    first_idx = np.full(n_groups, n, dtype=np.int64)
+    np.minimum.at(first_idx, group, order[core_pos])
+    rank = np.empty(n_groups, dtype=np.int64)
+    rank[np.argsort(first_idx)] = np.arange(n_groups)
+    core_label = rank[group]
+    
+    sorted_labels = np.full(n, -1, dtype=np.int64)
+    sorted_labels[core_pos] = core_label
+    
+    # Border points: only the nearest core on either side can reach them
+    border = np.setdiff1d(pos, core_pos, assume_unique=True)
+    if len(border) > 0:
+        none = np.iinfo(np.int64).max
+        right = np.searchsorted(core_pos, border)
+        left = right - 1
+        lc = np.clip(left, 0, len(core_pos) - 1)
+        rc = np.clip(right, 0, len(core_pos) - 1)
+        from_left = np.where((left >= 0) & within(core_pos[lc], border), core_label[lc], none)
+        from_right = np.where((right < len(core_pos)) & within(border, core_pos[rc]), core_label[rc], none)
+        best = np.minimum(from_left, from_right)
+        best[best == none] = -1
+        sorted_labels[border] = best
+    
+    labels[order] = sorted_labels
+    return labels
 
 
 def infer_racks_from_bins(locs, bin_spacing_tolerance=20, vertical_alignment_tolerance=5):
@@ -46,18 +133,15 @@ def infer_racks_from_bins(locs, bin_spacing_tolerance=20, vertical_alignment_tol
     
     # Detect vertical racks (bins with similar x-coordinates)
     # These represent columns of bins on the same rack structure
-    x_coords = bins['x'].values.reshape(-1, 1)
-    clustering = DBSCAN(eps=vertical_alignment_tolerance, min_samples=2).fit(x_coords)
+    x_coords = bins['x'].to_numpy()
+    bins['rack_id'] = cluster_1d(x_coords, vertical_alignment_tolerance, min_samples=2)
     
-    bins['rack_id'] = clustering.labels_
-    bins['rack_side'] = 'none'
+    # Positions of each rack's bins, for assigning sides without boolean scans
+    rack_positions = bins.groupby('rack_id').indices
+    side_arr = np.full(len(bins), 'none', dtype=object)
     
     # Now detect pairs of racks that are close together (opposite sides of aisle)
-    rack_centers = {}
-    for rack_id in set(bins['rack_id']) - {-1}:
-        rack_bins = bins[bins['rack_id'] == rack_id]
-        center_x = rack_bins['x'].mean()
-        rack_centers[rack_id] = center_x
+    rack_centers = bins.loc[bins['rack_id'] >= 0].groupby('rack_id')['x'].mean().to_dict()
     
     # Find pairs of racks that face each other across an aisle
     rack_pairs = {}
@@ -78,8 +162,8 @@ def infer_racks_from_bins(locs, bin_spacing_tolerance=20, vertical_alignment_tol
                 right_rack = rack2 if left_rack == rack1 else rack1
                 
                 # Mark sides
-                bins.loc[bins['rack_id'] == left_rack, 'rack_side'] = 'left'
-                bins.loc[bins['rack_id'] == right_rack, 'rack_side'] = 'right'
+                side_arr[rack_positions[left_rack]] = 'left'
+                side_arr[rack_positions[right_rack]] = 'right'
                 
                 rack_pairs[left_rack] = right_rack
                 rack_pairs[right_rack] = left_rack
@@ -88,6 +172,8 @@ def infer_racks_from_bins(locs, bin_spacing_tolerance=20, vertical_alignment_tol
                 paired_racks.add(rack2)
                 break
     
+    bins['rack_side'] = side_arr
+    
     # Merge back to main dataframe
     locs['rack_id'] = -1
     locs['rack_side'] = 'none'
@@ -114,10 +200,14 @@ def get_rack_boundaries(locs, rack_id):
         return None
     
     # Calculate boundaries including bin dimensions
-    min_x = rack_bins.apply(lambda row: row['x'] - row['width']/2, axis=1).min()
-    max_x = rack_bins.apply(lambda row: row['x'] + row['width']/2, axis=1).max()
-    min_y = rack_bins.apply(lambda row: row['y'] - row['depth']/2, axis=1).min()
-    max_y = rack_bins.apply(lambda row: row['y'] + row['depth']/2, axis=1).max()
+    x = rack_bins['x'].to_numpy()
+    y = rack_bins['y'].to_numpy()
+    half_w = rack_bins['width'].to_numpy() / 2
+    half_d = rack_bins['depth'].to_numpy() / 2
+    min_x = (x - half_w).min()
+    max_x = (x + half_w).max()
+    min_y = (y - half_d).min()
+    max_y = (y + half_d).max()
     
     return {
         'min_x': min_x,
@@ -129,6 +219,67 @@ def get_rack_boundaries(locs, rack_id):
     }
 
 
+def _segments_hit_rects(x1, y1, x2, y2, min_x, min_y, max_x, max_y):
+    """
+    Check a batch of line segments against a batch of axis-aligned rectangles.
+    
+    Evaluates the three stages of the obstacle test for every (segment,
+    rectangle) pair without branching: endpoint inside a rectangle,
+    bounding-box overlap, and the line_segments_intersect parametric test
+    against the four edges of every rectangle. The masks are combined at
+    the end, so no pair takes an early exit.
+    
+    Args:
+        x1, y1, x2, y2: Arrays of segment endpoints, one entry per segment
+        min_x, min_y, max_x, max_y: Arrays of rectangle bounds
+    
+    Returns:
+        Boolean array, True where the segment touches any rectangle
+    """
+    x1, y1 = x1[:, None], y1[:, None]
+    x2, y2 = x2[:, None], y2[:, None]
+    
+    # Either endpoint inside a rectangle
+    hit = np.zeros(len(x1), dtype=bool)
+    for px, py in ((x1, y1), (x2, y2)):
+        hit |= ((min_x <= px) & (px <= max_x) & (min_y <= py) & (py <= max_y)).any(axis=1)
+    
+    # Bounding-box overlap, (segments, rectangles)
+    overlap = ~((np.maximum(x1, x2) < min_x) | (np.minimum(x1, x2) > max_x) |
+                (np.maximum(y1, y2) < min_y) | (np.minimum(y1, y2) > max_y))
+    
+    # Rectangle edges (bottom, right, top, left) as p3 -> p4, one row per edge
+    x3 = np.stack((min_x, max_x, max_x, min_x))[:, None, :]
+    y3 = np.stack((min_y, min_y, max_y, max_y))[:, None, :]
+    x4 = np.stack((max_x, max_x, min_x, min_x))[:, None, :]
+    y4 = np.stack((min_y, max_y, max_y, min_y))[:, None, :]
+    
+    # Same parametric test as line_segments_intersect
+    denom = (x1 - x2) * (y3 - y4) - (y1 - y2) * (x3 - x4)
+    parallel = np.abs(denom) < 1e-10
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = ((x1 - x3) * (y3 - y4) - (y1 - y3) * (x3 - x4)) / denom
+        u = -((x1 - x2) * (y1 - y3) - (y1 - y2) * (x1 - x3)) / denom
+    crossing = ~parallel & (0 <= t) & (t <= 1) & (0 <= u) & (u <= 1)
+    
+    return hit | (crossing.any(axis=0) & overlap).any(axis=1)
+
+
+def _segment_hits_rects(x1, y1, x2, y2, min_x, min_y, max_x, max_y):
+    """
+    Check a line segment against a batch of axis-aligned rectangles.
+    
+    Args:
+        x1, y1, x2, y2: Segment endpoints
+        min_x, min_y, max_x, max_y: Arrays of rectangle bounds
+    
+    Returns:
+        True if the segment touches any rectangle, False otherwise
+    """
+    return bool(_segments_hit_rects(np.array([x1]), np.array([y1]), np.array([x2]), np.array([y2]),
+                                    min_x, min_y, max_x, max_y)[0])
+
+
 def check_line_intersects_obstacle(p1, p2, obstacle_center, obstacle_width, obstacle_depth):
     """
     Check if a line segment from p1 to p2 intersects with a rectangular obstacle.
@@ -149,38 +300,9 @@ def check_line_intersects_obstacle(p1, p2, obstacle_center, obstacle_width, obst
     obs_min_y = obs_y - obstacle_depth / 2
     obs_max_y = obs_y + obstacle_depth / 2
     
-    # Check if either endpoint is inside the obstacle
-    for p in [p1, p2]:
-        if (obs_min_x <= p[0] <= obs_max_x and obs_min_y <= p[1] <= obs_max_y):
-            return True
-    
-    # Simple line-rectangle intersection test using separating axis theorem
-    # For simplicity, we'll use a more conservative approach:
-    # Check if the line's bounding box overlaps with the obstacle
-    line_min_x = min(p1[0], p2[0])
-    line_max_x = max(p1[0], p2[0])
-    line_min_y = min(p1[1], p2[1])
-    line_max_y = max(p1[1], p2[1])
-    
-    # No overlap if bounding boxes don't intersect
-    if (line_max_x < obs_min_x or line_min_x > obs_max_x or
-        line_max_y < obs_min_y or line_min_y > obs_max_y):
-        return False
-    
-    # If bounding boxes overlap, do detailed line-segment intersection
-    # Check intersection with each edge of the rectangle
-    rect_edges = [
-        ((obs_min_x, obs_min_y), (obs_max_x, obs_min_y)),  # bottom
-        ((obs_max_x, obs_min_y), (obs_max_x, obs_max_y)),  # right
-        ((obs_max_x, obs_max_y), (obs_min_x, obs_max_y)),  # top
-        ((obs_min_x, obs_max_y), (obs_min_x, obs_min_y))   # left
-    ]
-    
-    for edge_p1, edge_p2 in rect_edges:
-        if line_segments_intersect(p1, p2, edge_p1, edge_p2):
-            return True
-    
-    return False
+    return _segment_hits_rects(p1[0], p1[1], p2[0], p2[1],
+                               np.array([obs_min_x]), np.array([obs_min_y]),
+                               np.array([obs_max_x]), np.array([obs_max_y]))
 
 
 def line_segments_intersect(p1, p2, p3, p4):
@@ -204,31 +326,65 @@ def line_segments_intersect(p1, p2, p3, p4):
     return 0 <= t <= 1 and 0 <= u <= 1
 
 
-def is_path_blocked(p1, p2, locs, min_clearance=1.0):
+def get_location_arrays(locs):
+    """
+    Extract the columns used by graph building as NumPy arrays, once.
+    
+    Args:
+        locs: DataFrame with location data (after aisle and rack detection)
+    
+    Returns:
+        dict with 'ids' (list), 'coords' ((N, 2) array) and one array per
+        column: x, y, width, depth, traversable, rack_id, rack_side,
+        v_aisle, h_aisle
+    """
+    arrays = {
+        'ids': locs['id'].tolist(),
+        'coords': locs[['x', 'y']].to_numpy(),
+        'traversable': locs['traversable'].eq(True).to_numpy(),
+        'rack_side': locs['rack_side'].to_numpy(),
+    }
+    for col in ['x', 'y', 'width', 'depth']:
+        arrays[col] = locs[col].to_numpy(dtype=np.float64)
+    for col in ['rack_id', 'v_aisle', 'h_aisle']:
+        arrays[col] = locs[col].to_numpy(dtype=np.int32)
+    return arrays
+
+
+def get_obstacle_array(locs):
+    """
+    Collect the non-traversable locations as an array for is_path_blocked.
+    
+    Args:
+        locs: DataFrame with location data
+    
+    Returns:
+        (M, 4) float array with one [x, y, width, depth] row per obstacle
+    """
+    obstacle_mask = locs['traversable'].eq(False).to_numpy()
+    return locs[['x', 'y', 'width', 'depth']].to_numpy(dtype=np.float64)[obstacle_mask]
+
+
+def is_path_blocked(p1, p2, obstacles, min_clearance=1.0):
     """
     Check if a straight-line path between two points is blocked by non-traversable obstacles.
     
+    All obstacles are tested at once with _segment_hits_rects.
+    
     Args:
         p1, p2: (x, y) tuples for the path endpoints
-        locs: DataFrame with location data
+        obstacles: Obstacle array from get_obstacle_array
         min_clearance: Minimum clearance required from obstacles
     
     Returns:
         True if path is blocked, False if clear
     """
-    # Get all non-traversable locations
-    obstacles = locs[locs['traversable'] == False]
-    
-    for _, obs in obstacles.iterrows():
-        obs_center = (obs['x'], obs['y'])
-        # Add clearance buffer to obstacle dimensions
-        obs_width = obs['width'] + 2 * min_clearance
-        obs_depth = obs['depth'] + 2 * min_clearance
-        
-        if check_line_intersects_obstacle(p1, p2, obs_center, obs_width, obs_depth):
-            return True
+    if len(obstacles) == 0:
+        return False
     
-    return False
+    # Add clearance buffer to obstacle dimensions
+    return _segment_hits_rects(p1[0], p1[1], p2[0], p2[1],
+                               *_obstacle_bounds(obstacles, min_clearance))
 
 
 def detect_aisles_with_dimensions(locs, x_tolerance=5, y_tolerance=5, min_aisle_size=3):
@@ -248,63 +404,165 @@ def detect_aisles_with_dimensions(locs, x_tolerance=5, y_tolerance=5, min_aisle_
     locs = infer_racks_from_bins(locs)
     
     # Only use traversable locations for aisle detection
-    traversable_locs = locs[locs['traversable'] == True]
+    trav_mask = locs['traversable'].eq(True).to_numpy()
     
-    if len(traversable_locs) == 0:
+    if not trav_mask.any():
         locs['v_aisle'] = -1
         locs['h_aisle'] = -1
         return locs
     
     # Detect vertical aisles (similar x-coordinates) - only from traversable locations
-    x_coords = traversable_locs['x'].values.reshape(-1, 1)
-    vertical_clusters = DBSCAN(eps=x_tolerance, min_samples=min_aisle_size).fit(x_coords)
+    x_coords = locs['x'].to_numpy()[trav_mask]
+    vertical_labels = cluster_1d(x_coords, x_tolerance, min_aisle_size)
     
     # Detect horizontal aisles (similar y-coordinates)
-    y_coords = traversable_locs['y'].values.reshape(-1, 1)
-    horizontal_clusters = DBSCAN(eps=y_tolerance, min_samples=min_aisle_size).fit(y_coords)
+    y_coords = locs['y'].to_numpy()[trav_mask]
+    horizontal_labels = cluster_1d(y_coords, y_tolerance, min_aisle_size)
     
     # Initialize all locations with -1 (not in aisle)
-    locs['v_aisle'] = -1
-    locs['h_aisle'] = -1
+    v_aisle = np.full(len(locs), -1, dtype=np.int64)
+    h_aisle = np.full(len(locs), -1, dtype=np.int64)
     
     # Assign aisle IDs only to traversable locations
-    locs.loc[traversable_locs.index, 'v_aisle'] = vertical_clusters.labels_
-    locs.loc[traversable_locs.index, 'h_aisle'] = horizontal_clusters.labels_
+    v_aisle[trav_mask] = vertical_labels
+    h_aisle[trav_mask] = horizontal_labels
+    locs['v_aisle'] = v_aisle
+    locs['h_aisle'] = h_aisle
     
     return locs
 
 
-def should_prevent_connection(locs, idx1, idx2):
+def should_prevent_connection(rack_ids, rack_sides, ys, idx1, idx2):
     """
     Check if a connection between two nodes should be prevented because
     it would go through a rack (opposite sides of same rack structure).
     
+    Works on single positions or on index arrays (one entry per pair).
+    
     Args:
-        locs: DataFrame with location data
-        idx1, idx2: Indices of the two locations
+        rack_ids: Array of rack_id values, one per location
+        rack_sides: Array of rack_side values, one per location
+        ys: Array of y-coordinates, one per location
+        idx1, idx2: Positional indices of the two locations
     
     Returns:
-        True if connection should be prevented, False otherwise
-    """
-    rack1 = locs.loc[idx1, 'rack_id']
-    rack2 = locs.loc[idx2, 'rack_id']
-    side1 = locs.loc[idx1, 'rack_side']
-    side2 = locs.loc[idx2, 'rack_side']
-    
-    # If both are bins on opposite sides of paired racks
-    if rack1 >= 0 and rack2 >= 0 and side1 != 'none' and side2 != 'none':
-        # Check if they're on opposite sides
-        if side1 != side2:
-            # Check if they're at similar y-coordinates (directly across from each other)
-            y1 = locs.loc[idx1, 'y']
-            y2 = locs.loc[idx2, 'y']
-            
-            # Allow connections at aisle ends (different y-coordinates)
-            # Prevent mid-aisle shortcuts through racks
-            if abs(y1 - y2) < 20:  # Within same vertical section
-                return True
+        True if connection should be prevented, False otherwise (a
+        boolean array when given index arrays)
+    """
+    rack1 = rack_ids[idx1]
+    rack2 = rack_ids[idx2]
+    side1 = rack_sides[idx1]
+    side2 = rack_sides[idx2]
+    
+    # Both are bins on opposite sides of paired racks, at similar
+    # y-coordinates (directly across from each other). Connections at
+    # aisle ends (different y-coordinates) are allowed; mid-aisle
+    # shortcuts through racks are prevented
+    return ((rack1 >= 0) & (rack2 >= 0) & (side1 != 'none') & (side2 != 'none') &
+            (side1 != side2) & (np.abs(ys[idx1] - ys[idx2]) < 20))
+
+
+def _aisle_step_pairs(nodes, aisles, keys):
+    """
+    Consecutive node pairs along every aisle, without building per-aisle lists.
+    
+    Nodes are ordered by aisle (in order of first appearance) and then by
+    key with a stable sort, so each aisle's run matches sorting its nodes
+    by key on their own.
+    
+    Args:
+        nodes: Array of positional indices to consider, in ascending order
+        aisles: Array of aisle ids, one per location (-1 for none)
+        keys: Array of sort keys along the aisle, one per location
+    
+    Returns:
+        (src, dst) arrays of positional indices, one entry per pair
+    """
+    nodes = nodes[aisles[nodes] >= 0]
+    _, first, inverse = np.unique(aisles[nodes], return_index=True, return_inverse=True)
+    group_rank = np.empty(len(first), dtype=np.intp)
+    group_rank[np.argsort(first, kind='stable')] = np.arange(len(first))
+    node_rank = group_rank[inverse]
+    
+    order = np.lexsort((keys[nodes], node_rank))
+    sorted_nodes = nodes[order]
+    same_aisle = node_rank[order][1:] == node_rank[order][:-1]
+    return sorted_nodes[:-1][same_aisle], sorted_nodes[1:][same_aisle]
+
+
+def _obstacle_bounds(obstacles, min_clearance=1.0):
+    """
+    Clearance-padded bounds of every obstacle, for _segments_hit_rects.
+    
+    Args:
+        obstacles: Obstacle array from get_obstacle_array
+        min_clearance: Minimum clearance required from obstacles
+    
+    Returns:
+        (min_x, min_y, max_x, max_y) tuple of arrays
+    """
+    obs_width = obstacles[:, 2] + 2 * min_clearance
+    obs_depth = obstacles[:, 3] + 2 * min_clearance
+    return (obstacles[:, 0] - obs_width / 2, obstacles[:, 1] - obs_depth / 2,
+            obstacles[:, 0] + obs_width / 2, obstacles[:, 1] + obs_depth / 2)
+
+
+def _segments_clear(src, dst, coords, bounds, chunk_size=250000):
+    """
+    Check which candidate edges are not blocked by any obstacle.
+    
+    Args:
+        src, dst: Arrays of positional indices, one entry per candidate edge
+        coords: (N, 2) array of location coordinates
+        bounds: Padded obstacle bounds from _obstacle_bounds
+        chunk_size: Upper bound on edge x obstacle tests held in memory at once
+    
+    Returns:
+        Boolean array, True where the straight path is clear
+    """
+    clear = np.ones(len(src), dtype=bool)
+    if len(bounds[0]) == 0:
+        return clear
+    
+    step = max(1, chunk_size // len(bounds[0]))
+    for start in range(0, len(src), step):
+        p1 = coords[src[start:start + step]]
+        p2 = coords[dst[start:start + step]]
+        clear[start:start + step] = ~_segments_hit_rects(p1[:, 0], p1[:, 1], p2[:, 0], p2[:, 1],
+                                                          *bounds)
+    return clear
+
+
+def _filter_edges(src, dst, coords, max_dist, rack_ids, rack_sides, obstacle_bounds):
+    """
+    Run the distance, rack and obstacle checks over a batch of candidate edges.
     
-    return False
+    Applies the distance threshold, should_prevent_connection and the
+    obstacle test of is_path_blocked (same bounds and kernel) to whole
+    arrays, with the obstacle test only run on the edges that pass the
+    cheaper checks.
+    
+    Args:
+        src, dst: Arrays of positional indices, one entry per candidate edge
+        coords: (N, 2) array of location coordinates
+        max_dist: Maximum edge length
+        rack_ids: Array of rack_id values, one per location
+        rack_sides: Array of rack_side values, one per location
+        obstacle_bounds: Padded obstacle bounds from _obstacle_bounds
+    
+    Returns:
+        (keep, dists): boolean mask of edges to add and their lengths
+    """
+    deltas = coords[dst] - coords[src]
+    dists = np.hypot(deltas[:, 0], deltas[:, 1])
+    keep = dists <= max_dist
+    
+    # No shortcuts through paired racks
+    keep &= ~should_prevent_connection(rack_ids, rack_sides, coords[:, 1], src, dst)
+    
+    candidates = np.flatnonzero(keep)
+    keep[candidates] = _segments_clear(src[candidates], dst[candidates], coords, obstacle_bounds)
+    return keep, dists
 
 
 def build_enhanced_graph(locs, max_intra_aisle_dist=20, max_cross_aisle_dist=15, 
@@ -330,174 +588,134 @@ def build_enhanced_graph(locs, max_intra_aisle_dist=20, max_cross_aisle_dist=15,
         List of edges as (node1_id, node2_id, distance) tuples
     """
     edges = []
-    coords = locs[['x', 'y']].values
-    ids = locs['id'].tolist()
+    arrays = get_location_arrays(locs)
+    coords = arrays['coords']
+    ids = arrays['ids']
+    obstacles = get_obstacle_array(locs)
+    
+    # Padded obstacle bounds are fixed for the whole build, so compute them once
+    obstacle_bounds = _obstacle_bounds(obstacles, min_clearance)
+    
+    # Column arrays for positional lookups in the loops below
+    v_aisle_arr = arrays['v_aisle']
+    h_aisle_arr = arrays['h_aisle']
+    rack_id_arr = arrays['rack_id']
+    rack_side_arr = arrays['rack_side']
+    x_arr = arrays['x']
+    y_arr = arrays['y']
     
     # Only consider traversable locations for routing
-    traversable_indices = locs[locs['traversable'] == True].index.tolist()
+    trav_mask = arrays['traversable']
+    trav_idx = np.flatnonzero(trav_mask)
+    traversable_indices = trav_idx.tolist()
     
     if verbose:
         num_traversable = len(traversable_indices)
-        num_obstacles = len(locs[locs['traversable'] == False])
-        num_racks = len(set(locs['rack_id']) - {-1})
+        num_obstacles = len(obstacles)
+        num_racks = len(np.unique(rack_id_arr[rack_id_arr >= 0]))
         print(f"Graph building: {num_traversable} traversable nodes, {num_obstacles} obstacles")
         if num_racks > 0:
             print(f"Detected {num_racks} rack structure(s) from bin locations")
     
-    # Group traversable nodes by vertical aisles
-    v_aisles = defaultdict(list)
-    for idx in traversable_indices:
-        v_aisle = locs.loc[idx, 'v_aisle']
-        if v_aisle >= 0:
-            v_aisles[v_aisle].append(idx)
-    
-    # Group traversable nodes by horizontal aisles
-    h_aisles = defaultdict(list)
-    for idx in traversable_indices:
-        h_aisle = locs.loc[idx, 'h_aisle']
-        if h_aisle >= 0:
-            h_aisles[h_aisle].append(idx)
-    
     # Identify intersection nodes
-    intersection_nodes = set()
-    for idx in traversable_indices:
-        if locs.loc[idx, 'v_aisle'] >= 0 and locs.loc[idx, 'h_aisle'] >= 0:
-            intersection_nodes.add(idx)
+    intersection_list = np.flatnonzero(trav_mask & (v_aisle_arr >= 0) & (h_aisle_arr >= 0))
     
-    if verbose and len(intersection_nodes) > 0:
-        print(f"Found {len(intersection_nodes)} intersection points")
+    if verbose and len(intersection_list) > 0:
+        print(f"Found {len(intersection_list)} intersection points")
     
-    # Connect nodes within same vertical aisle (sort by y-coordinate)
-    for aisle_id, node_indices in v_aisles.items():
-        if len(node_indices) < 2:
-            continue
-        sorted_nodes = sorted(node_indices, key=lambda i: locs.loc[i, 'y'])
-        for i in range(len(sorted_nodes) - 1):
-            idx1, idx2 = sorted_nodes[i], sorted_nodes[i + 1]
-            
-            # Check if this would cross through a rack
-            if should_prevent_connection(locs, idx1, idx2):
-                continue
-            
-            p1 = (coords[idx1][0], coords[idx1][1])
-            p2 = (coords[idx2][0], coords[idx2][1])
-            dist = calculate_distance(p1, p2)
-            
-            if dist <= max_intra_aisle_dist:
-                # Check if path is blocked by obstacles
-                if not is_path_blocked(p1, p2, locs, min_clearance):
-                    edges.append((ids[idx1], ids[idx2], dist))
-    
-    # Connect nodes within same horizontal aisle (sort by x-coordinate)
-    for aisle_id, node_indices in h_aisles.items():
-        if len(node_indices) < 2:
-            continue
-        sorted_nodes = sorted(node_indices, key=lambda i: locs.loc[i, 'x'])
-        for i in range(len(sorted_nodes) - 1):
-            idx1, idx2 = sorted_nodes[i], sorted_nodes[i + 1]
-            
-            # Check if this would cross through a rack
-            if should_prevent_connection(locs, idx1, idx2):
-                continue
-            
-            p1 = (coords[idx1][0], coords[idx1][1])
-            p2 = (coords[idx2][0], coords[idx2][1])
-            dist = calculate_distance(p1, p2)
-            
-            if dist <= max_intra_aisle_dist:
-                # Check if path is blocked by obstacles
-                if not is_path_blocked(p1, p2, locs, min_clearance):
-                    edges.append((ids[idx1], ids[idx2], dist))
+    # Candidate edges per phase as (src, dst, max_dist)
+    # Connect nodes within same vertical aisle (sort by y-coordinate), then
+    # within same horizontal aisle (sort by x-coordinate)
+    phases = [_aisle_step_pairs(trav_idx, v_aisle_arr, y_arr) + (max_intra_aisle_dist,),
+              _aisle_step_pairs(trav_idx, h_aisle_arr, x_arr) + (max_intra_aisle_dist,)]
     
     # Cross-aisle connections at intersection points
-    for i in intersection_nodes:
-        for j in intersection_nodes:
-            if i >= j:
-                continue
-            # Skip if already in same aisle
-            if (locs.loc[i, 'v_aisle'] == locs.loc[j, 'v_aisle'] and locs.loc[i, 'v_aisle'] >= 0):
-                continue
-            if (locs.loc[i, 'h_aisle'] == locs.loc[j, 'h_aisle'] and locs.loc[i, 'h_aisle'] >= 0):
-                continue
-            
-            # Check if this would cross through a rack
-            if should_prevent_connection(locs, i, j):
-                continue
-            
-            p1 = (coords[i][0], coords[i][1])
-            p2 = (coords[j][0], coords[j][1])
-            dist = calculate_distance(p1, p2)
-            
-            if dist <= max_cross_aisle_dist:
-                # Check if path is blocked by obstacles
-                if not is_path_blocked(p1, p2, locs, min_clearance):
-                    edges.append((ids[i], ids[j], dist))
+    # Only pairs within max_cross_aisle_dist are enumerated, via a KD-tree
+    if len(intersection_list) > 1:
+        local_pairs = cKDTree(coords[intersection_list]).query_pairs(max_cross_aisle_dist, output_type='ndarray')
+        local_pairs = np.sort(local_pairs, axis=1)
+        local_pairs = local_pairs[np.lexsort((local_pairs[:, 1], local_pairs[:, 0]))]
+        pair_idx = intersection_list[local_pairs]
+        src, dst = pair_idx[:, 0], pair_idx[:, 1]
+        
+        # Skip if already in same aisle
+        same_aisle = (((v_aisle_arr[src] == v_aisle_arr[dst]) & (v_aisle_arr[src] >= 0)) |
+                      ((h_aisle_arr[src] == h_aisle_arr[dst]) & (h_aisle_arr[src] >= 0)))
+        phases.append((src[~same_aisle], dst[~same_aisle], max_cross_aisle_dist))
+    
+    # The phases are independent and NumPy releases the GIL in the
+    # obstacle test, so filter them side by side; edges keep phase order
+    with ThreadPoolExecutor(max_workers=len(phases)) as pool:
+        futures = [pool.submit(_filter_edges, src, dst, coords, max_dist, rack_id_arr,
+                               rack_side_arr, obstacle_bounds)
+                   for src, dst, max_dist in phases]
+        for (src, dst, _), future in zip(phases, futures):
+            keep, dists = future.result()
+            for i in np.flatnonzero(keep).tolist():
+                edges.append((ids[src[i]], ids[dst[i]], dists[i].item()))
     
     # Connect isolated traversable nodes to nearest neighbors
     isolated = [idx for idx in traversable_indices 
-                if locs.loc[idx, 'v_aisle'] == -1 and locs.loc[idx, 'h_aisle'] == -1]
+                if v_aisle_arr[idx] == -1 and h_aisle_arr[idx] == -1]
     
     for iso_idx in isolated:
-        distances = []
-        p1 = (coords[iso_idx][0], coords[iso_idx][1])
-        
-        for idx in traversable_indices:
-            if idx == iso_idx:
-                continue
-            p2 = (coords[idx][0], coords[idx][1])
-            dist = calculate_distance(p1, p2)
-            
-            # Check if path is clear
-            if not is_path_blocked(p1, p2, locs, min_clearance):
-                distances.append((idx, dist))
+        # Distances and obstacle checks against every other traversable node at once
+        others = trav_idx[trav_idx != iso_idx]
+        src = np.full(len(others), iso_idx)
+        deltas = coords[others] - coords[iso_idx]
+        dists = np.hypot(deltas[:, 0], deltas[:, 1])
+        clear = np.flatnonzero(_segments_clear(src, others, coords, obstacle_bounds))
         
         # Connect to 2 nearest for redundancy
-        distances.sort(key=lambda x: x[1])
-        for idx, dist in distances[:2]:
-            edges.append((ids[iso_idx], ids[idx], dist))
+        nearest = clear[np.argsort(dists[clear], kind='stable')[:2]]
+        for i in nearest.tolist():
+            edges.append((ids[iso_idx], ids[others[i]], dists[i].item()))
     
     # Ensure connectivity
     if ensure_connectivity:
-        temp_G = nx.Graph()
-        for idx in traversable_indices:
-            temp_G.add_node(locs.loc[idx, 'id'])
-        for a, b, d in edges:
-            temp_G.add_edge(a, b)
+        # Label connected components on a sparse adjacency matrix over the
+        # traversable nodes, in positional order
+        trav_pos = dict(zip((ids[idx] for idx in traversable_indices), range(len(trav_idx))))
+        src = np.fromiter((trav_pos[a] for a, b, d in edges), dtype=int, count=len(edges))
+        dst = np.fromiter((trav_pos[b] for a, b, d in edges), dtype=int, count=len(edges))
+        n = len(trav_idx)
+        adjacency = csr_matrix((np.ones(len(src)), (src, dst)), shape=(n, n))
+        n_components, labels = connected_components(adjacency, directed=False)
         
-        components = list(nx.connected_components(temp_G))
-        if len(components) > 1:
+        if n_components > 1:
             if verbose:
-                print(f"Connecting {len(components)} disconnected components...")
+                print(f"Connecting {n_components} disconnected components...")
+            
+            order = np.argsort(labels, kind='stable')
+            comp_idx = np.split(trav_idx[order], np.cumsum(np.bincount(labels))[:-1])
+            comp_nodes = [[ids[idx] for idx in c_idx.tolist()] for c_idx in comp_idx]
+            comp_trees = [cKDTree(coords[c_idx]) for c_idx in comp_idx]
             
             # Connect all components to form a single connected graph
-            for i in range(len(components) - 1):
-                comp1 = components[i]
-                comp2_remaining = []
-                for j in range(i + 1, len(components)):
-                    comp2_remaining.extend(components[j])
+            for i in range(n_components - 1):
+                comp1 = comp_nodes[i]
+                points = coords[comp_idx[i]]
                 
-                min_dist = float('inf')
-                best_pair = None
+                # Nearest node of every later component to each point of comp1;
+                # the closest pair overall becomes the bridge.
+                # Allow longer connections to bridge components
+                # Relax obstacle checking for connectivity bridges
+                best = None
+                for j in range(i + 1, n_components):
+                    dists, nearest = comp_trees[j].query(points, k=1)
+                    a = int(np.argmin(dists))
+                    if best is None or dists[a] < best[0]:
+                        best = (dists[a], a, j, int(nearest[a]))
                 
-                for node1 in comp1:
-                    idx1 = locs[locs['id'] == node1].index[0]
-                    p1 = (coords[idx1][0], coords[idx1][1])
-                    
-                    for node2 in comp2_remaining:
-                        idx2 = locs[locs['id'] == node2].index[0]
-                        p2 = (coords[idx2][0], coords[idx2][1])
-                        dist = calculate_distance(p1, p2)
-                        
-                        # Allow longer connections to bridge components
-                        # Relax obstacle checking for connectivity bridges
-                        if dist < min_dist:
-                            min_dist = dist
-                            best_pair = (node1, node2, dist)
+                _, a, j, b = best
+                p1 = coords[comp_idx[i][a]]
+                p2 = coords[comp_idx[j][b]]
+                dist = math.hypot(p1[0] - p2[0], p1[1] - p2[1])
+                best_pair = (comp1[a], comp_nodes[j][b], dist)
                 
-                if best_pair:
-                    edges.append(best_pair)
-                    if verbose:
-                        print(f"  Connected component {i+1} to rest: {best_pair[0]} ↔ {best_pair[1]} ({best_pair[2]:.2f} units)")
+                edges.append(best_pair)
+                if verbose:
+                    print(f"  Connected component {i+1} to rest: {best_pair[0]} ↔ {best_pair[1]} ({best_pair[2]:.2f} units)")
     
     return edges
 
@@ -519,23 +737,15 @@ def create_graph_from_edges(locs, edges):
     
     # Only add traversable nodes to the graph
     # Non-traversable locations are obstacles, not routing nodes
-    traversable_locs = locs[locs['traversable'] == True]
+    traversable_locs = locs[locs['traversable'].eq(True).to_numpy()]
     
     # Add nodes with all attributes including physical properties
-    for _, row in traversable_locs.iterrows():
-        node_attrs = {
-            'x': row.x, 
-            'y': row.y,
-            'type': row.type,
-            'zone': row.zone,
-            'width': row.width,
-            'depth': row.depth,
-            'traversable': row.traversable,
-            'v_aisle': row.v_aisle,
-            'h_aisle': row.h_aisle,
-            'rack_id': row.rack_id
-        }
-        G.add_node(row.id, **node_attrs)
+    attr_cols = ['x', 'y', 'type', 'zone', 'width', 'depth', 'traversable',
+                 'v_aisle', 'h_aisle', 'rack_id']
+    G.add_nodes_from(
+        (row[0], dict(zip(attr_cols, row[1:])))
+        for row in traversable_locs[['id'] + attr_cols].itertuples(index=False, name=None)
+    )
     
     # Add edges
     for a, b, d in edges:
@@ -6,14 +6,83 @@ Creates graphs based on obstacle-aware pathfinding, considering which areas
 are traversable and which are blocked by racks, equipment, etc.
 """
 
+import heapq
 import json
-import math
 import numpy as np
 import networkx as nx
+import shapely
+from concurrent.futures import ThreadPoolExecutor
+from scipy.spatial import cKDTree
 from shapely.geometry import Polygon, LineString, Point
 from collections import defaultdict
 
 
+# Margin added around the outer box in the segment/box fast path, so float
+# rounding can never turn a grazing contact into a reported miss
+_BOX_EPS = 1e-9
+
+
+def _segments_hit_boxes(p1, p2, boxes):
+    """
+    Liang-Barsky clip of many segments against many axis-aligned boxes.
+    
+    Args:
+        p1, p2: (E, 2) arrays of segment endpoints
+        boxes: (M, 4) array of xmin, ymin, xmax, ymax per box
+    
+    Returns:
+        (E, M) bool array: True where the segment touches the box
+    """
+    d = p2 - p1
+    t_enter = np.zeros((len(p1), len(boxes)))
+    t_exit = np.ones((len(p1), len(boxes)))
+    outside = np.zeros((len(p1), len(boxes)), dtype=bool)
+    
+    # One slab per axis: entering through the low side, leaving through the high side
+    for axis in (0, 1):
+        start = p1[:, axis][:, None]
+        step = d[:, axis][:, None]
+        low = boxes[:, axis][None, :] - start
+        high = boxes[:, axis + 2][None, :] - start
+        parallel = step == 0
+        outside |= parallel & ((low > 0) | (high < 0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t_low = low / step
+            t_high = high / step
+        t_near = np.where(parallel, 0.0, np.minimum(t_low, t_high))
+        t_far = np.where(parallel, 1.0, np.maximum(t_low, t_high))
+        t_enter = np.maximum(t_enter, t_near)
+        t_exit = np.minimum(t_exit, t_far)
+    
+    return ~outside & (t_enter <= t_exit)
+
+
+def _segment_hits_box(x1, y1, x2, y2, box):
+    """
+    Liang-Barsky clip of one segment against one axis-aligned box.
+    
+    Args:
+        x1, y1: Start point
+        x2, y2: End point
+        box: (xmin, ymin, xmax, ymax) tuple
+    
+    Returns:
+        bool: True if the segment touches the box
+    """
+    t_enter, t_exit = 0.0, 1.0
+    for start, step, low, high in ((x1, x2 - x1, box[0], box[2]), (y1, y2 - y1, box[1], box[3])):
+        low -= start
+        high -= start
+        if step == 0:
+            if low > 0 or high < 0:
+                return False
+            continue
+        t_low, t_high = low / step, high / step
+        t_enter = max(t_enter, min(t_low, t_high))
+        t_exit = min(t_exit, max(t_low, t_high))
+    return t_enter <= t_exit
+
+
 class WarehouseObject:
     """Represents a physical object in the warehouse with dimensions."""
     
@@ -30,6 +99,8 @@ class WarehouseObject:
         # Create bounding box polygon
         half_w = self.width / 2
         half_d = self.depth / 2
+        self.bbox = (self.center_x - half_w, self.center_y - half_d,
+                     self.center_x + half_w, self.center_y + half_d)
         self.polygon = Polygon([
             (self.center_x - half_w, self.center_y - half_d),
             (self.center_x + half_w, self.center_y - half_d),
@@ -57,8 +128,8 @@ class WarehouseObject:
     
     def intersects_line(self, x1, y1, x2, y2):
         """Check if a line segment intersects this object."""
-        line = LineString([(x1, y1), (x2, y2)])
-        return self.polygon.intersects(line)
+        # The object is an axis-aligned box, so a clip test is exact
+        return _segment_hits_box(x1, y1, x2, y2, self.bbox)
 
 
 class PhysicalWarehouse:
@@ -93,6 +164,27 @@ class PhysicalWarehouse:
                     'type': obj.type,
                     'parent': None
                 }
+        
+        # Node fields as parallel arrays, in self.nodes order: an (N, 2)
+        # coordinate array plus one array per attribute
+        self._node_ids = list(self.nodes)
+        self._id_to_idx = {node_id: i for i, node_id in enumerate(self._node_ids)}
+        self._coords = np.array([[node['x'], node['y']] for node in self.nodes.values()],
+                                dtype=np.float64).reshape(-1, 2)
+        self._node_types = np.array([node['type'] for node in self.nodes.values()], dtype=object)
+        self._node_parents = np.array([node['parent'] for node in self.nodes.values()], dtype=object)
+        self._kdtree = cKDTree(self._coords)
+        
+        # Buffered obstacle polygons and their bounding boxes, keyed by
+        # tolerance; they never change for a given tolerance, so each is built once
+        self._buffered_obstacles = {}
+        self._obstacle_boxes = {}
+        self._obstacle_bounds = np.array([obstacle.bbox for obstacle in self.obstacles],
+                                         dtype=np.float64).reshape(-1, 4)
+        
+        # Axis-aligned extent (x_min, y_min, x_max, y_max) of every object
+        self._object_extents = np.array([obj.bbox for obj in self.objects],
+                                        dtype=np.float64).reshape(-1, 4)
     
     def is_path_clear(self, x1, y1, x2, y2, tolerance=0.1):
         """
@@ -106,18 +198,118 @@ class PhysicalWarehouse:
         Returns:
             bool: True if path is clear, False if blocked
         """
-        line = LineString([(x1, y1), (x2, y2)])
+        buffers, _ = self._obstacle_buffers(tolerance)
+        boxes = self._obstacle_boxes[tolerance]
+        min_x, max_x = min(x1, x2), max(x1, x2)
+        min_y, max_y = min(y1, y2), max(y1, y2)
+        line = None
         
         # Check against all non-traversable obstacles
-        for obstacle in self.obstacles:
-            # Use a small buffer to be slightly conservative
-            if obstacle.polygon.buffer(tolerance).intersects(line):
+        # Use a small buffer to be slightly conservative
+        for obstacle, buffered, (obs_min_x, obs_min_y, obs_max_x, obs_max_y) in zip(
+                self.obstacles, buffers, boxes):
+            # Only obstacles whose bounding box overlaps the path's can block it
+            if obs_max_x < min_x or obs_min_x > max_x or obs_max_y < min_y or obs_min_y > max_y:
+                continue
+            
+            # Touching the bare rectangle means the buffer is hit too, and
+            # missing the buffer's box means it is missed; GEOS only decides
+            # the paths in between (near the rounded corners)
+            if tolerance > 0 and _segment_hits_box(x1, y1, x2, y2, obstacle.bbox):
+                return False
+            if not _segment_hits_box(x1, y1, x2, y2, (obs_min_x - _BOX_EPS, obs_min_y - _BOX_EPS,
+                                                      obs_max_x + _BOX_EPS, obs_max_y + _BOX_EPS)):
+                continue
+            
+            if line is None:
+                line = LineString([(x1, y1), (x2, y2)])
+            if buffered.intersects(line):
                 # Additional check: if both points are pick points of the same rack,
                 # they might be on opposite sides - this is OK
                 return False
         
         return True
     
+    def _obstacle_buffers(self, tolerance):
+        """
+        Get the obstacle polygons grown by tolerance, building them on first use.
+        
+        Args:
+            tolerance: Buffer distance
+        
+        Returns:
+            tuple: (buffers, bounds)
+                buffers: np.ndarray of shapely polygons, one per obstacle
+                bounds: (M, 4) array of xmin, ymin, xmax, ymax per buffer
+        """
+        if tolerance not in self._buffered_obstacles:
+            buffers = np.array([obstacle.polygon.buffer(tolerance) for obstacle in self.obstacles],
+                               dtype=object)
+            bounds = shapely.bounds(buffers).reshape(-1, 4)
+            self._buffered_obstacles[tolerance] = (buffers, bounds)
+            self._obstacle_boxes[tolerance] = [tuple(box) for box in bounds.tolist()]
+        return self._buffered_obstacles[tolerance]
+    
+    def _paths_clear(self, src, dst, tolerance=0.1, chunk_size=250000):
+        """
+        Batch form of is_path_clear for many node-to-node paths.
+        
+        Args:
+            src, dst: Sequences of node indices (into self._node_ids), one per path
+            tolerance: Small buffer to avoid edge cases
+            chunk_size: Upper bound on path x obstacle tests held in memory at once
+        
+        Returns:
+            np.ndarray of bool: True where the path is clear
+        """
+        if len(src) == 0 or not self.obstacles:
+            return np.ones(len(src), dtype=bool)
+        
+        src = np.asarray(src, dtype=np.intp)
+        dst = np.asarray(dst, dtype=np.intp)
+        self._obstacle_buffers(tolerance)  # fill the cache before any worker reads it
+        step = max(1, chunk_size // len(self.obstacles))
+        chunks = [(src[start:start + step], dst[start:start + step], tolerance)
+                  for start in range(0, len(src), step)]
+        if len(chunks) == 1:
+            return self._chunk_clear(*chunks[0])
+        
+        # The box clips and GEOS calls release the GIL, so chunks run in parallel
+        with ThreadPoolExecutor() as pool:
+            return np.concatenate(list(pool.map(lambda chunk: self._chunk_clear(*chunk), chunks)))
+    
+    def _chunk_clear(self, src, dst, tolerance):
+        """
+        Check one chunk of paths for _paths_clear.
+        
+        Args:
+            src, dst: Node index arrays, one entry per path
+            tolerance: Small buffer to avoid edge cases
+        
+        Returns:
+            np.ndarray of bool: True where the path is clear
+        """
+        p1, p2 = self._coords[src], self._coords[dst]
+        buffers, bounds = self._obstacle_buffers(tolerance)
+        
+        # Obstacles are rectangles, so clip every path against two boxes per
+        # obstacle: touching the bare rectangle means the buffer is hit too,
+        # and missing the buffer's bounding box means the buffer is missed.
+        # GEOS only sees the pairs in between (near the rounded corners).
+        blocked = np.zeros(len(src), dtype=bool)
+        outer = _segments_hit_boxes(p1, p2, bounds + [-_BOX_EPS, -_BOX_EPS, _BOX_EPS, _BOX_EPS])
+        if tolerance > 0:
+            inner = _segments_hit_boxes(p1, p2, self._obstacle_bounds)
+            blocked |= inner.any(axis=1)
+            outer &= ~inner
+        outer[blocked] = False
+        path_idx, obstacle_idx = np.nonzero(outer)
+        
+        lines = shapely.linestrings(np.stack([p1, p2], axis=1))
+        hits = shapely.intersects(lines[path_idx], buffers[obstacle_idx])
+        blocked[path_idx[hits]] = True
+        return ~blocked
+    
     def get_nearby_nodes(self, node_id, max_distance=20):
         """
         Get nodes within max_distance that could potentially connect.
@@ -129,20 +321,46 @@ class PhysicalWarehouse:
         Returns:
             List of (node_id, distance) tuples
         """
-        source = self.nodes[node_id]
-        nearby = []
+        i = self._id_to_idx[node_id]
+        candidates = np.array(self._kdtree.query_ball_point(self._coords[i], r=max_distance,
+                                                            return_sorted=True), dtype=np.intp)
+        candidates = candidates[candidates != i]
+        diff = self._coords[candidates] - self._coords[i]
+        dist_sq = np.einsum('ij,ij->i', diff, diff)
         
-        for other_id, other in self.nodes.items():
-            if other_id == node_id:
-                continue
-            
-            dist = math.sqrt((source['x'] - other['x'])**2 + 
-                           (source['y'] - other['y'])**2)
-            
-            if dist <= max_distance:
-                nearby.append((other_id, dist))
+        # Apply the squared-distance cut of a full scan to the tree's hits
+        keep = dist_sq <= max_distance * max_distance
+        candidates = candidates[keep]
+        dists = np.sqrt(dist_sq[keep])
         
-        return sorted(nearby, key=lambda x: x[1])
+        # Stable sort keeps self.nodes order between equal distances
+        order = np.argsort(dists, kind='stable')
+        return [(self._node_ids[j], d) for j, d in zip(candidates[order].tolist(), dists[order].tolist())]
+    
+    def _nearby_pairs(self, max_distance):
+        """
+        All-nodes form of get_nearby_nodes, from one KD-tree pair query.
+        
+        Args:
+            max_distance: Maximum distance to consider
+        
+        Returns:
+            tuple: (src, dst, dists) arrays of directed pairs, grouped by
+                source in self.nodes order, each group ordered as
+                get_nearby_nodes orders it
+        """
+        pairs = self._kdtree.query_pairs(max_distance, output_type='ndarray').reshape(-1, 2)
+        diff = self._coords[pairs[:, 1]] - self._coords[pairs[:, 0]]
+        dist_sq = np.einsum('ij,ij->i', diff, diff)
+        keep = dist_sq <= max_distance * max_distance
+        pairs = pairs[keep]
+        dists = np.sqrt(dist_sq[keep])
+        
+        src = np.concatenate([pairs[:, 0], pairs[:, 1]])
+        dst = np.concatenate([pairs[:, 1], pairs[:, 0]])
+        dists = np.concatenate([dists, dists])
+        order = np.lexsort((dst, dists, src))
+        return src[order], dst[order], dists[order]
     
     def build_graph(self, max_connection_dist=30, verbose=True):
         """
@@ -164,35 +382,27 @@ class PhysicalWarehouse:
         G = nx.Graph()
         
         # Add all nodes
-        for node_id, node_data in self.nodes.items():
-            G.add_node(node_id, 
-                      x=node_data['x'], 
-                      y=node_data['y'],
-                      type=node_data['type'],
-                      parent=node_data['parent'])
-        
-        # Build edges by checking visibility
-        edges_added = 0
-        edges_blocked = 0
-        
-        for node_id in self.nodes:
-            nearby = self.get_nearby_nodes(node_id, max_connection_dist)
-            source = self.nodes[node_id]
-            
-            for other_id, dist in nearby:
-                # Skip if edge already exists (undirected graph)
-                if G.has_edge(node_id, other_id):
-                    continue
-                
-                other = self.nodes[other_id]
-                
-                # Check if path is clear
-                if self.is_path_clear(source['x'], source['y'], 
-                                     other['x'], other['y']):
-                    G.add_edge(node_id, other_id, weight=dist)
-                    edges_added += 1
-                else:
-                    edges_blocked += 1
+        G.add_nodes_from(
+            (node_id, {'x': x, 'y': y, 'type': node_type, 'parent': parent})
+            for node_id, (x, y), node_type, parent in zip(
+                self._node_ids, self._coords.tolist(), self._node_types, self._node_parents))
+        
+        # Build edges by checking visibility. Every node's nearby list (as
+        # get_nearby_nodes returns it) is laid end to end; each undirected
+        # pair is tested once, in the direction it is first reached
+        src, dst, dists = self._nearby_pairs(max_connection_dist)
+        first = src < dst
+        src, dst, dists = src[first], dst[first], dists[first]
+        clear = self._paths_clear(src, dst)
+        
+        # A clear pair is added on first sight and skipped on the way back;
+        # a blocked pair is rejected from both ends
+        ids = self._node_ids
+        G.add_weighted_edges_from(
+            (ids[a], ids[b], d)
+            for a, b, d in zip(src[clear].tolist(), dst[clear].tolist(), dists[clear].tolist()))
+        edges_added = int(clear.sum())
+        edges_blocked = 2 * int((~clear).sum())
         
         if verbose:
             print(f"  Edges added: {edges_added}")
@@ -212,64 +422,77 @@ class PhysicalWarehouse:
     
     def _connect_components(self, G, components, verbose=True):
         """Connect disconnected components by finding safe paths."""
-        # Keep connecting until all components are merged
-        while len(components) > 1:
-            best_connection = None
-            best_dist = float('inf')
-            comp_pair = None
+        # Component members as node index arrays, in self.nodes order
+        members = [np.array(sorted(self._id_to_idx[n] for n in comp), dtype=np.intp)
+                   for comp in components]
+        
+        # Kruskal over the component pairs: each pair keeps its cross
+        # distances (squared; the root is only needed for the bridges that
+        # are kept) in increasing order, and a heap holds the next
+        # candidate of every pair
+        candidates = {}
+        heap = []
+        for i in range(len(components)):
+            xy1 = self._coords[members[i]]
+            for j in range(i + 1, len(components)):
+                xy2 = self._coords[members[j]]
+                dx = xy1[:, 0][:, None] - xy2[:, 0][None, :]
+                dy = xy1[:, 1][:, None] - xy2[:, 1][None, :]
+                dist_sq = (dx ** 2 + dy ** 2).ravel()
+                order = np.argsort(dist_sq, kind='stable')
+                candidates[i, j] = (dist_sq[order].tolist(), order.tolist(), len(xy2))
+                heapq.heappush(heap, (candidates[i, j][0][0], i, j, 0))
+        
+        # Union-find over the original components
+        root = list(range(len(components)))
+        
+        def find(c):
+            while root[c] != c:
+                root[c] = root[root[c]]
+                c = root[c]
+            return c
+        
+        remaining = len(components)
+        while heap and remaining > 1:
+            d2, i, j, pos = heapq.heappop(heap)
+            
+            # Candidates between components that are already merged are dropped
+            if find(i) == find(j):
+                continue
             
-            # Try all pairs of components
-            for i in range(len(components)):
-                comp1 = list(components[i])
-                for j in range(i + 1, len(components)):
-                    comp2 = list(components[j])
-                    
-                    # Find closest pair that has clear path
-                    for n1 in comp1:
-                        p1 = self.nodes[n1]
-                        for n2 in comp2:
-                            p2 = self.nodes[n2]
-                            dist = math.sqrt((p1['x'] - p2['x'])**2 + (p1['y'] - p2['y'])**2)
-                            
-                            if dist < best_dist and self.is_path_clear(p1['x'], p1['y'], 
-                                                                        p2['x'], p2['y']):
-                                best_dist = dist
-                                best_connection = (n1, n2, dist)
-                                comp_pair = (i, j)
+            dists_sq, order, width = candidates[i, j]
+            a, b = divmod(order[pos], width)
+            node1, node2 = members[i][a], members[j][b]
+            xy1, xy2 = self._coords[node1], self._coords[node2]
+            if not self.is_path_clear(xy1[0], xy1[1], xy2[0], xy2[1]):
+                # Blocked: move on to this pair's next closest candidate
+                if pos + 1 < len(dists_sq):
+                    heapq.heappush(heap, (dists_sq[pos + 1], i, j, pos + 1))
+                continue
             
-            if best_connection:
-                G.add_edge(best_connection[0], best_connection[1], 
-                          weight=best_connection[2])
-                if verbose:
-                    print(f"  Connected components: {best_connection[0]} <-> {best_connection[1]} (dist: {best_dist:.2f})")
-                
-                # Merge the two components
-                merged = components[comp_pair[0]].union(components[comp_pair[1]])
-                components = [comp for i, comp in enumerate(components) 
-                             if i not in comp_pair] + [merged]
-            else:
-                # Can't connect any more components with clear paths
-                if verbose:
-                    print(f"  ⚠ Could not connect all components (remaining: {len(components)})")
-                break
+            dist = np.sqrt(d2).item()
+            G.add_edge(self._node_ids[node1], self._node_ids[node2], weight=dist)
+            if verbose:
+                print(f"  Connected components: {self._node_ids[node1]} <-> "
+                      f"{self._node_ids[node2]} (dist: {dist:.2f})")
+            root[find(i)] = find(j)
+            remaining -= 1
+        
+        if remaining > 1 and verbose:
+            # Can't connect any more components with clear paths
+            print(f"  ⚠ Could not connect all components (remaining: {remaining})")
     
     def get_bounds(self):
         """Get the bounding box of the warehouse."""
-        all_x = [node['x'] for node in self.nodes.values()]
-        all_y = [node['y'] for node in self.nodes.values()]
-        
-        # Include object boundaries
-        for obj in self.objects:
-            half_w = obj.width / 2
-            half_d = obj.depth / 2
-            all_x.extend([obj.center_x - half_w, obj.center_x + half_w])
-            all_y.extend([obj.center_y - half_d, obj.center_y + half_d])
+        # Node positions plus both edges of every object extent
+        all_x = np.concatenate([self._coords[:, 0], self._object_extents[:, [0, 2]].ravel()])
+        all_y = np.concatenate([self._coords[:, 1], self._object_extents[:, [1, 3]].ravel()])
         
         return {
-            'x_min': min(all_x),
-            'x_max': max(all_x),
-            'y_min': min(all_y),
-            'y_max': max(all_y)
+            'x_min': float(all_x.min()),
+            'x_max': float(all_x.max()),
+            'y_min': float(all_y.min()),
+            'y_max': float(all_y.max())
         }
 
 
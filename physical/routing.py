@@ -57,36 +57,64 @@ def solve_tsp(G, pick_locations, cycle=False, method='christofides'):
     
     if method == 'christofides':
         # Christofides algorithm
-        tsp_route = approx.traveling_salesman_problem(
-            G, nodes=valid_picks, cycle=cycle, weight='weight', method=approx.christofides
-        )
+        tsp_method = approx.christofides
     elif method == 'greedy':
         # Greedy nearest neighbor
-        tsp_route = approx.traveling_salesman_problem(
-            G, nodes=valid_picks, cycle=cycle, weight='weight', method=approx.greedy_tsp
-        )
+        tsp_method = approx.greedy_tsp
     elif method == 'simulated_annealing':
         # Simulated annealing
-        tsp_route = approx.traveling_salesman_problem(
-            G, nodes=valid_picks, cycle=cycle, weight='weight', method=approx.simulated_annealing_tsp
-        )
+        tsp_method = approx.simulated_annealing_tsp
     else:
         # Default to Christofides
-        tsp_route = approx.traveling_salesman_problem(
-            G, nodes=valid_picks, cycle=cycle, weight='weight'
-        )
+        tsp_method = approx.christofides
     
-    # Calculate total distance
+    return _tsp_over_picks(G, valid_picks, cycle, tsp_method)
+
+
+def _tsp_over_picks(G, picks, cycle, tsp_method):
+    """
+    Same route as approx.traveling_salesman_problem, with Dijkstra run from
+    the picks only rather than from every node in the graph.
+    
+    Args:
+        G: NetworkX graph
+        picks: Node IDs to visit
+        cycle: If True, return to starting location
+        tsp_method: networkx TSP solver applied to the complete pick graph
+    
+    Returns:
+        tuple: (route_list, total_distance)
+    """
+    dist = {}
+    path = {}
+    for pick in dict.fromkeys(picks):
+        dist[pick], path[pick] = nx.single_source_dijkstra(G, pick, weight='weight')
+    
+    GG = nx.Graph()
+    for u in picks:
+        for v in picks:
+            if u != v:
+                GG.add_edge(u, v, weight=dist[u][v])
+    
+    best = tsp_method(GG, weight='weight')
+    legs = list(zip(best, best[1:]))
+    
+    if not cycle:
+        # Drop the longest leg and start the route right after it
+        u, v = max(legs, key=lambda leg: dist[leg[0]][leg[1]])
+        pos = best.index(u) + 1
+        while best[pos] != v:
+            pos = best[pos:].index(u) + 1
+        best = best[pos:-1] + best[:pos]
+        legs = list(zip(best, best[1:]))
+    
+    route = []
     total_distance = 0
-    for i in range(len(tsp_route) - 1):
-        if G.has_edge(tsp_route[i], tsp_route[i+1]):
-            total_distance += G[tsp_route[i]][tsp_route[i+1]]['weight']
-        else:
-            # Need to find path between non-adjacent nodes
-            path_len = nx.shortest_path_length(G, tsp_route[i], tsp_route[i+1], weight='weight')
-            total_distance += path_len
-    
-    return tsp_route, total_distance
+    for u, v in legs:
+        route.extend(path[u][v][:-1])
+        total_distance += dist[u][v]
+    route.append(best[-1])
+    return route, total_distance
 
 
 def solve_tsp_with_endpoints(G, start_node, pick_locations, end_node, method='2-opt'):
@@ -110,19 +138,40 @@ def solve_tsp_with_endpoints(G, start_node, pick_locations, end_node, method='2-
     if not valid_picks:
         return None, None, None
     
+    # Shortest-path lengths from the start and every pick, computed once
+    dist = _shortest_distances(G, [start_node] + valid_picks)
+    
     if method == 'exhaustive' and len(valid_picks) <= 10:
         # Exhaustive search for small sets
-        return _solve_tsp_exhaustive(G, start_node, valid_picks, end_node)
+        return _solve_tsp_exhaustive(G, start_node, valid_picks, end_node, dist)
     elif method == '2-opt':
-        return _solve_tsp_2opt(G, start_node, valid_picks, end_node)
+        return _solve_tsp_2opt(G, start_node, valid_picks, end_node, dist)
     elif method == 'christofides':
-        return _solve_tsp_christofides(G, start_node, valid_picks, end_node)
+        return _solve_tsp_christofides(G, start_node, valid_picks, end_node, dist)
     else:  # greedy
-        return _solve_tsp_greedy(G, start_node, valid_picks, end_node)
+        return _solve_tsp_greedy(G, start_node, valid_picks, end_node, dist)
 
 
-def _solve_tsp_greedy(G, start_node, pick_locations, end_node):
+def _shortest_distances(G, sources):
+    """
+    Shortest-path lengths from each source to every reachable node.
+    
+    Args:
+        G: NetworkX graph
+        sources: Node IDs to run Dijkstra from
+    
+    Returns:
+        dict: source -> {target: distance}; unreachable targets are absent
+    """
+    return {source: nx.single_source_dijkstra_path_length(G, source, weight='weight')
+            for source in dict.fromkeys(sources)}
+
+
+def _solve_tsp_greedy(G, start_node, pick_locations, end_node, dist=None):
     """Greedy nearest neighbor heuristic"""
+    if dist is None:
+        dist = _shortest_distances(G, [start_node] + list(pick_locations))
+    
     current = start_node
     remaining = set(pick_locations)
     route = [start_node]
@@ -134,10 +183,10 @@ def _solve_tsp_greedy(G, start_node, pick_locations, end_node):
         nearest_dist = float('inf')
         
         for pick in remaining:
-            if nx.has_path(G, current, pick):
-                dist = nx.shortest_path_length(G, current, pick, weight='weight')
-                if dist < nearest_dist:
-                    nearest_dist = dist
+            if pick in dist[current]:
+                pick_dist = dist[current][pick]
+                if pick_dist < nearest_dist:
+                    nearest_dist = pick_dist
                     nearest = pick
         
         if nearest is None:
@@ -151,19 +200,21 @@ def _solve_tsp_greedy(G, start_node, pick_locations, end_node):
         current = nearest
     
     # Add path to end
-    if nx.has_path(G, current, end_node):
+    if end_node in dist[current]:
         final_segment = nx.shortest_path(G, current, end_node, weight='weight')
-        final_dist = nx.shortest_path_length(G, current, end_node, weight='weight')
         route.extend(final_segment[1:])
-        total_distance += final_dist
+        total_distance += dist[current][end_node]
     
     return route, total_distance, pick_order
 
 
-def _solve_tsp_2opt(G, start_node, pick_locations, end_node):
+def _solve_tsp_2opt(G, start_node, pick_locations, end_node, dist=None):
     """2-opt local search improvement on greedy solution"""
+    if dist is None:
+        dist = _shortest_distances(G, [start_node] + list(pick_locations))
+    
     # Start with greedy solution
-    route, distance, pick_order = _solve_tsp_greedy(G, start_node, pick_locations, end_node)
+    route, distance, pick_order = _solve_tsp_greedy(G, start_node, pick_locations, end_node, dist)
     
     if not pick_order or len(pick_order) < 3:
         return route, distance, pick_order
@@ -173,33 +224,31 @@ def _solve_tsp_2opt(G, start_node, pick_locations, end_node):
     iterations = 0
     max_iterations = 100
     
+    def end_leg(pick):
+        # Leg from the last pick to the end node (none if unreachable)
+        return dist[pick].get(end_node, 0)
+    
     while improved and iterations < max_iterations:
         improved = False
         iterations += 1
         
         for i in range(len(pick_order) - 1):
+            a, b = pick_order[i], pick_order[i + 1]
             for j in range(i + 2, len(pick_order)):
-                # Try reversing segment between i and j
-                new_order = pick_order[:i+1] + pick_order[i+1:j+1][::-1] + pick_order[j+1:]
-                
-                # Calculate new distance
-                new_distance = 0
-                current = start_node
+                # Try reversing segment between i and j; only the two legs
+                # around the segment change: a->b, c->d become a->c, b->d
+                c = pick_order[j]
+                if j + 1 < len(pick_order):
+                    d = pick_order[j + 1]
+                    delta = dist[a][c] + dist[b][d] - dist[a][b] - dist[c][d]
+                else:
+                    delta = dist[a][c] + end_leg(b) - dist[a][b] - end_leg(c)
                 
-                for pick in new_order:
-                    if nx.has_path(G, current, pick):
-                        new_distance += nx.shortest_path_length(G, current, pick, weight='weight')
-                        current = pick
-                    else:
-                        new_distance = float('inf')
-                        break
-                
-                if current != end_node and nx.has_path(G, current, end_node):
-                    new_distance += nx.shortest_path_length(G, current, end_node, weight='weight')
-                
-                if new_distance < distance:
-                    pick_order = new_order
-                    distance = new_distance
+                # Small tolerance so float noise in the mirrored legs
+                # cannot make a zero-gain move look like an improvement
+                if delta < -1e-9:
+                    pick_order = pick_order[:i+1] + pick_order[i+1:j+1][::-1] + pick_order[j+1:]
+                    distance += delta
                     improved = True
                     break
             
@@ -213,23 +262,24 @@ def _solve_tsp_2opt(G, start_node, pick_locations, end_node):
     
     for pick in pick_order:
         path_segment = nx.shortest_path(G, current, pick, weight='weight')
-        segment_dist = nx.shortest_path_length(G, current, pick, weight='weight')
         route.extend(path_segment[1:])
-        total_distance += segment_dist
+        total_distance += dist[current][pick]
         current = pick
     
     final_segment = nx.shortest_path(G, current, end_node, weight='weight')
-    final_dist = nx.shortest_path_length(G, current, end_node, weight='weight')
     route.extend(final_segment[1:])
-    total_distance += final_dist
+    total_distance += dist[current][end_node]
     
     return route, total_distance, pick_order
 
 
-def _solve_tsp_exhaustive(G, start_node, pick_locations, end_node):
+def _solve_tsp_exhaustive(G, start_node, pick_locations, end_node, dist=None):
     """Exhaustive search (only for small sets)"""
     import itertools
     
+    if dist is None:
+        dist = _shortest_distances(G, [start_node] + list(pick_locations))
+    
     best_distance = float('inf')
     best_order = None
     
@@ -238,14 +288,15 @@ def _solve_tsp_exhaustive(G, start_node, pick_locations, end_node):
         current = start_node
         
         for pick in perm:
-            if not nx.has_path(G, current, pick):
+            row = dist[current]
+            if pick not in row:
                 total_dist = float('inf')
                 break
-            total_dist += nx.shortest_path_length(G, current, pick, weight='weight')
+            total_dist += row[pick]
             current = pick
         
-        if current != end_node and nx.has_path(G, current, end_node):
-            total_dist += nx.shortest_path_length(G, current, end_node, weight='weight')
+        if current != end_node and end_node in dist[current]:
+            total_dist += dist[current][end_node]
         
         if total_dist < best_distance:
             best_distance = total_dist
@@ -269,13 +320,13 @@ def _solve_tsp_exhaustive(G, start_node, pick_locations, end_node):
     return route, best_distance, best_order
 
 
-def _solve_tsp_christofides(G, start_node, pick_locations, end_node):
+def _solve_tsp_christofides(G, start_node, pick_locations, end_node, dist=None):
     """Christofides algorithm wrapper"""
     # Build complete graph of distances between picks + endpoints
     nodes = [start_node] + pick_locations + [end_node]
     
     # For now, fall back to 2-opt (Christofides requires more setup)
-    return _solve_tsp_2opt(G, start_node, pick_locations, end_node)
+    return _solve_tsp_2opt(G, start_node, pick_locations, end_node, dist)
 
 
 def demonstrate_opposite_shelf_routing(G, locs):
@@ -81,7 +81,14 @@ def find_default_start(locs):
     return locs.iloc[0]['id']
 
 
-def main():
+def main(argv=None):
+    """
+    Run the solver from the command line.
+    
+    Args:
+        argv: Argument list without the program name (default: sys.argv[1:]),
+            so the CLI can also be driven in-process
+    """
     parser = argparse.ArgumentParser(
         description='Warehouse TSP Solver - Optimize pick routes in warehouses',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -104,7 +111,7 @@ def main():
     parser.add_argument('--stats', action='store_true',
                        help='Show detailed statistics')
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     # Ensure output directory exists
     output_dir = Path('output')